@@ -1,17 +1,28 @@
-from src.llm.generate import generate_answer
+from src.llm.generate import agenerate_answer, prepare_prompt, finalize_answer
+from src.llm.client import astream_answer
+from src.llm.abstention import is_abstention
 from src.eval.evaluation import hallucination_score,compute_confidence
+from src.serving.executor import run_cpu
+from src.serving.answer_cache import get_answer_cache
+from src.metrics import in_flight, observe_request, timed
+from src.config import get_section
+import asyncio
+import json
 import time
 from fastapi import  HTTPException
 
-import concurrent.futures
 
-EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+def _request_timeout() -> float:
+    return get_section("serving").get("request_timeout_s", 16)
 
-def run_with_timeout(fn, timeout=16):
-    future = EXECUTOR.submit(fn)
+
+async def run_with_timeout(coro, timeout=None):
+    if timeout is None:
+        timeout = _request_timeout()
     try:
-        return future.result(timeout=timeout)
-    except concurrent.futures.TimeoutError:
+        # wait_for cancels the pipeline on timeout, aborting the in-flight LLM call
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
         raise HTTPException(
             status_code=504,
             detail={
@@ -38,20 +49,11 @@ def build_citations(chunks: list[dict]) -> list[dict]:
 
     return citations
 
-ABSTENTION_ANSWERS = {
-    "i don't know.",
-    "i don't know based on the given context.",
-    "not enough information in the context."
-}
-
 def handle_abstention(answer: str):
-    return answer.strip().lower() in ABSTENTION_ANSWERS
+    return is_abstention(answer)
 
 
-
-def generate(query: str,judge):
-    start = time.perf_counter()
-    answer= run_with_timeout(lambda: generate_answer(query))
+async def score_answer(answer: dict, judge, start: float) -> dict:
     ans = answer["answer"]
     retrieved_chunks = answer["context"]
     reranked_chunks = answer.get("context_raw", retrieved_chunks)
@@ -61,12 +63,13 @@ def generate(query: str,judge):
             "sources": [],
             "hallucination_score": 1.0,
             "confidence": 0.0,
-            "latency_ms": 0
+            "latency_ms": (time.perf_counter() - start) * 1000
         }
 
     if not retrieved_chunks:
         retrieved_chunks=reranked_chunks[:3]
-    result=hallucination_score(ans,retrieved_chunks,judge)
+    with timed("judge"):
+        result=await run_cpu(hallucination_score,ans,retrieved_chunks,judge)
     latency_ms = (time.perf_counter() - start) * 1000
     sources=build_citations(retrieved_chunks)
 
@@ -78,3 +81,126 @@ def generate(query: str,judge):
       "confidence": confidence,
       "latency_ms": latency_ms
     }
+
+
+async def lookup_cached(query: str, start: float):
+    cache = get_answer_cache()
+    if cache is None:
+        return None, None
+
+    cached, probe = await run_cpu(cache.lookup, query)
+    if cached is not None:
+        cached = {**cached, "latency_ms": (time.perf_counter() - start) * 1000}
+    return cached, probe
+
+
+def store_cached(probe, response: dict) -> None:
+    cache = get_answer_cache()
+    if cache is not None and probe is not None:
+        cache.put(probe, response)
+
+
+def _outcome(response: dict) -> str:
+    return "abstained" if handle_abstention(response["answer"]) else "answered"
+
+
+async def generate(query: str,judge):
+    start = time.perf_counter()
+    with in_flight("query"):
+        try:
+            cached, probe = await lookup_cached(query, start)
+            if cached is not None:
+                observe_request("query", "cache_hit", start)
+                return cached
+
+            answer= await run_with_timeout(agenerate_answer(query))
+            response = await score_answer(answer, judge, start)
+        except HTTPException:
+            observe_request("query", "timeout", start)
+            raise
+        except Exception:
+            observe_request("query", "error", start)
+            raise
+
+        store_cached(probe, response)
+        observe_request("query", _outcome(response), start)
+        return response
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def generate_stream(query: str, judge):
+    """
+    Server-Sent Events for /query/stream:
+      citations -> retrieved sources, sent before generation starts
+      token     -> answer text deltas
+      done      -> final answer, supported sources, hallucination score, confidence
+      error     -> timeout
+    """
+    start = time.perf_counter()
+    deadline = start + _request_timeout()
+
+    with in_flight("query_stream"):
+
+        try:
+            cached, probe = await lookup_cached(query, start)
+            if cached is not None:
+                yield _sse("citations", cached["sources"])
+                yield _sse("token", cached["answer"])
+                yield _sse("done", cached)
+                observe_request("query_stream", "cache_hit", start)
+                return
+
+            prepared = await asyncio.wait_for(
+                run_cpu(prepare_prompt, query),
+                timeout=deadline - time.perf_counter(),
+            )
+
+            if "answer" in prepared:
+                yield _sse("citations", [])
+                yield _sse("token", prepared["answer"])
+                response = await score_answer(prepared, judge, start)
+                store_cached(probe, response)
+                yield _sse("done", response)
+                observe_request("query_stream", _outcome(response), start)
+                return
+
+            yield _sse("citations", build_citations(prepared["reranked"]))
+
+            parts = []
+            if prepared["cached_answer"] is not None:
+                parts.append(prepared["cached_answer"])
+                yield _sse("token", prepared["cached_answer"])
+            else:
+                tokens = astream_answer(prepared["prompt"])
+                try:
+                    while True:
+                        try:
+                            delta = await asyncio.wait_for(
+                                anext(tokens),
+                                timeout=deadline - time.perf_counter(),
+                            )
+                        except StopAsyncIteration:
+                            break
+                        parts.append(delta)
+                        yield _sse("token", delta)
+                finally:
+                    await tokens.aclose()
+
+            answer = await run_cpu(finalize_answer, "".join(parts), prepared)
+            response = await score_answer(answer, judge, start)
+            store_cached(probe, response)
+            yield _sse("done", response)
+            observe_request("query_stream", _outcome(response), start)
+
+        except asyncio.TimeoutError:
+            observe_request("query_stream", "timeout", start)
+            yield _sse("error", {
+                "error": "TIMEOUT",
+                "message": "Request exceeded time limit."
+            })
+        except Exception:
+            observe_request("query_stream", "error", start)
+            raise
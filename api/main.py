@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from api.routes.routes import router
-from src.test.exact_match import load_judge_model
+from src.serving.judge import get_judge_service
+from src.serving.answer_cache import get_answer_cache
+from src.llm.client import get_backend
+from src.serving.prompt_cache import get_prompt_cache
+from src.metrics import render_metrics
 import api.core.model_store as model_store
-from src.embedding.embedding_model import load_embedding_model
+from src.embedding.embedding_model import get_embedding_model
+from src.index.index_utils import warm_up as warm_up_index
 
 
 
@@ -16,14 +21,46 @@ app = FastAPI()
 @app.on_event("startup")
 def load_models():
 
-    model_store.embedding_model = load_embedding_model()
-    model_store.judge_model = load_judge_model()
+    model_store.embedding_model = get_embedding_model()
+    model_store.judge_model = get_judge_service()
+    warm_up_index()
 
     print(" Embedding model loaded")
     print(" Judge model loaded")
+    print(" Index and metadata loaded")
 
 app.include_router(router)
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/stats/judge")
+def judge_stats():
+    return model_store.judge_model.stats()
+
+
+
+@app.get("/stats/cache")
+def cache_stats():
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+
+@app.get("/stats/prompt_cache")
+def prompt_cache_stats():
+    cache = get_prompt_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
+
+
+@app.get("/stats/llm")
+def llm_stats():
+    return get_backend().stats()
+
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
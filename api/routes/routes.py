@@ -1,12 +1,22 @@
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from api.schemas import QueryRequest, QueryResponse
-from api.core.generator import generate
+from api.core.generator import generate, generate_stream
 import api.core.model_store as model_store
 
 router = APIRouter()
 
 
 @router.post("/query", response_model=QueryResponse)
-def query_movie(req: QueryRequest):
-    result = generate(req.query,model_store.judge_model)
+async def query_movie(req: QueryRequest):
+    result = await generate(req.query,model_store.judge_model)
     return result
+
+
+@router.post("/query/stream")
+async def query_movie_stream(req: QueryRequest):
+    return StreamingResponse(
+        generate_stream(req.query, model_store.judge_model),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,40 @@
+import { NextResponse } from "next/server";
+
+export async function POST(req: Request) {
+  try {
+    const body = await req.json();
+
+    const backendRes = await fetch(
+      process.env.BACKEND_STREAM_URL || "http://localhost:8000/query/stream",
+      {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify(body),
+      }
+    );
+
+    if (!backendRes.ok || !backendRes.body) {
+      const text = await backendRes.text();
+      return NextResponse.json(
+        { error: "Backend error", details: text },
+        { status: backendRes.status }
+      );
+    }
+
+    // Pass the SSE stream straight through so tokens reach the browser as they arrive
+    return new Response(backendRes.body, {
+      headers: {
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        Connection: "keep-alive",
+      },
+    });
+  } catch (err: any) {
+    return NextResponse.json(
+      { error: "Internal API error", details: err.message },
+      { status: 500 }
+    );
+  }
+}
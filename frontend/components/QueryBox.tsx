@@ -1,7 +1,7 @@
 "use client";
 
 import { useState } from "react";
-import { askQuestion } from "@/lib/api";
+import { askQuestionStream } from "@/lib/api";
 import { QueryResponse } from "@/types";
 import { 
   Send, 
@@ -34,8 +34,28 @@ export default function QueryBox({
       onLoading(true);
       onError(null);
 
-      const data = await askQuestion(query);
-      onResult(data);
+      // Render citations and tokens as they stream in; the final event
+      // replaces the partial answer with scored sources.
+      let partial: QueryResponse = {
+        answer: "",
+        sources: [],
+        hallucination_score: 0,
+        latency_ms: 0,
+        confidence: 0,
+      };
+
+      await askQuestionStream(query, {
+        onCitations: (sources) => {
+          partial = { ...partial, sources };
+          onLoading(false);
+          onResult(partial);
+        },
+        onToken: (token) => {
+          partial = { ...partial, answer: partial.answer + token };
+          onResult(partial);
+        },
+        onDone: (data) => onResult(data),
+      });
       setQuery(""); 
     } catch (err: any) {
       onError(err.message || "Something went wrong");
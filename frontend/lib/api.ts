@@ -1,4 +1,4 @@
-import { QueryResponse, AskRequest } from "@/types";
+import { QueryResponse, AskRequest, StreamHandlers } from "@/types";
 
 export async function askQuestion(
   query: AskRequest
@@ -15,3 +15,53 @@ export async function askQuestion(
 
   return res.json();
 }
+
+function dispatchEvent(raw: string, handlers: StreamHandlers) {
+  let event = "message";
+  const data: string[] = [];
+
+  for (const line of raw.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+  }
+
+  if (!data.length) return;
+  const payload = JSON.parse(data.join("\n"));
+
+  if (event === "citations") handlers.onCitations?.(payload);
+  else if (event === "token") handlers.onToken?.(payload);
+  else if (event === "done") handlers.onDone?.(payload);
+  else if (event === "error") throw new Error(payload.message || "Stream error");
+}
+
+export async function askQuestionStream(
+  query: string,
+  handlers: StreamHandlers
+): Promise<void> {
+  const res = await fetch("/api/ask/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ query }),
+  });
+
+  if (!res.ok || !res.body) {
+    throw new Error("Failed to fetch response");
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      dispatchEvent(buffer.slice(0, sep), handlers);
+      buffer = buffer.slice(sep + 2);
+    }
+  }
+}
@@ -18,3 +18,9 @@ export interface QueryResponse {
   latency_ms: number;
   confidence: number;
 }
+
+export interface StreamHandlers {
+  onCitations?: (sources: SourceDoc[]) => void;
+  onToken?: (token: string) => void;
+  onDone?: (data: QueryResponse) => void;
+}
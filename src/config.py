@@ -0,0 +1,23 @@
+from pathlib import Path
+import yaml
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+_config = None
+
+
+def get_config() -> dict:
+    global _config
+    if _config is None:
+        with open(PROJECT_ROOT / "config.yaml", "r") as f:
+            _config = yaml.safe_load(f) or {}
+    return _config
+
+
+def get_section(name: str) -> dict:
+    return get_config().get(name) or {}
+
+
+def resolve_path(path: str) -> Path:
+    path = Path(path)
+    return path if path.is_absolute() else PROJECT_ROOT / path
@@ -1,19 +1,14 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from pathlib import Path
-import yaml
 
-PROJECT_ROOT = Path(__file__).resolve().parents[2]
+from src.config import get_section
 
 _engine = None
 _SessionLocal = None
 
 
 def get_db_config():
-    config_path = PROJECT_ROOT / "config.yaml"
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
-    return config["database"]
+    return get_section("database")
 
 
 def get_engine():
@@ -24,6 +19,10 @@ def get_engine():
             f"postgresql+psycopg2://{db['user']}:{db['password']}@"
             f"{db['host']}:{db['port']}/{db['name']}",
             pool_pre_ping=True,
+            pool_size=db.get("pool_size", 10),
+            max_overflow=db.get("max_overflow", 5),
+            pool_timeout=db.get("pool_timeout", 5),
+            pool_recycle=db.get("pool_recycle", 1800),
             future=True,
         )
     return _engine
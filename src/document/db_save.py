@@ -100,7 +100,6 @@ class MetadataStore2:
                         text
                     FROM meta
                     WHERE doc_id = ANY(:doc_id)
-                    ORDER BY doc_id
                 """),
                 {"doc_id": doc_id},
             )
@@ -5,6 +5,7 @@ from tqdm import tqdm
 
 from .embedding_model import load_embedding_model
 from .embedding_cache import EmbeddingCache
+from .quantize import save_embeddings, STORAGE_TYPES
 
 
 BATCH_SIZE = 64
@@ -24,7 +25,7 @@ REQUIRED_COLUMNS = {
 }
 
 
-def embed_chunks(chunks_df: pd.DataFrame):
+def embed_chunks(chunks_df: pd.DataFrame, storage: tuple = ()):
 
     missing = REQUIRED_COLUMNS - set(chunks_df.columns)
     if missing:
@@ -69,7 +70,12 @@ def embed_chunks(chunks_df: pd.DataFrame):
 
     embeddings = np.vstack(embeddings).astype("float32")
 
-    np.save(os.path.join(OUTPUT_DIR, "embeddings.npy"), embeddings)
+    # float32 is always written: it is the exact copy used for re-scoring
+    embeddings_path = os.path.join(OUTPUT_DIR, "embeddings.npy")
+    np.save(embeddings_path, embeddings)
+    for extra in storage:
+        if extra != "float32":
+            save_embeddings(embeddings, embeddings_path, extra)
 
     meta_df = chunks_df
     meta_df.insert(0, "vector_id", np.arange(len(meta_df), dtype=np.int64))
@@ -82,5 +88,17 @@ def embed_chunks(chunks_df: pd.DataFrame):
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--storage",
+        choices=STORAGE_TYPES,
+        nargs="*",
+        default=[],
+        help="extra quantized copies to write next to embeddings.npy",
+    )
+    args = parser.parse_args()
+
     chunks= pd.read_csv("data/processed/retrieval_chunks.csv")
-    embed_chunks(chunks)
\ No newline at end of file
+    embed_chunks(chunks, storage=tuple(args.storage))
\ No newline at end of file
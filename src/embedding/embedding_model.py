@@ -1,9 +1,69 @@
+import threading
+
+import numpy as np
 from sentence_transformers import SentenceTransformer
 
+from src.config import get_section
+from src.serving.batcher import MicroBatcher
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_model = None
+_model_lock = threading.Lock()
+_query_batcher = None
+
 
 def load_embedding_model(
-    model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+    model_name: str = DEFAULT_MODEL_NAME,
     device: str | None = None,
 ):
-    return SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2",local_files_only=True)
+    return SentenceTransformer(model_name, device=device, local_files_only=True)
+
+
+def get_embedding_model():
+    """
+    Process-wide shared embedding model.
+    Query encoding, rerank and support filtering all resolve through here,
+    so the weights are deserialized once and held in memory once.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_embedding_model()
+    return _model
+
+
+def _encode_batch(texts: list[str]) -> np.ndarray:
+    embeddings = get_embedding_model().encode(
+        texts,
+        batch_size=len(texts),
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(embeddings, dtype="float32")
+
+
+def _get_query_batcher() -> MicroBatcher:
+    global _query_batcher
+    if _query_batcher is None:
+        with _model_lock:
+            if _query_batcher is None:
+                cfg = get_section("embedding")
+                _query_batcher = MicroBatcher(
+                    _encode_batch,
+                    max_batch_size=cfg.get("max_batch_size", 16),
+                    window_ms=cfg.get("batch_window_ms", 3.0),
+                    name="query-encoder",
+                )
+    return _query_batcher
+
 
+def encode_query(text: str) -> np.ndarray:
+    """
+    Normalized float32 embedding of a single short text (query or answer).
+    Concurrent callers are micro-batched into one forward pass.
+    """
+    if get_section("embedding").get("batch_window_ms", 3.0) <= 0:
+        return _encode_batch([text])[0]
+    return _get_query_batcher().run(text)
@@ -0,0 +1,168 @@
+import argparse
+import os
+
+import numpy as np
+
+STORAGE_TYPES = ("float32", "fp16", "sq8")
+
+EMBEDDINGS_PATH = "data/embeddings/embeddings.npy"
+
+
+def storage_path(path: str, storage: str) -> str:
+    if storage == "float32":
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{storage}{ext}"
+
+
+def _sq8_params_path(path: str) -> str:
+    root, ext = os.path.splitext(storage_path(path, "sq8"))
+    return f"{root}_params{ext}"
+
+
+def encode_sq8(embeddings: np.ndarray):
+    """Per-dimension 8-bit scalar quantization: x ~= code * scale + vmin."""
+    vmin = embeddings.min(axis=0)
+    scale = (embeddings.max(axis=0) - vmin) / 255.0
+    scale[scale == 0] = 1.0
+
+    codes = np.rint((embeddings - vmin) / scale).clip(0, 255).astype(np.uint8)
+    return codes, np.stack([vmin, scale]).astype(np.float32)
+
+
+class SQ8Embeddings:
+    """Row-gatherable view over SQ8 codes; rows come back dequantized to float32."""
+
+    def __init__(self, codes: np.ndarray, params: np.ndarray):
+        self.codes = codes
+        self.vmin, self.scale = params[0], params[1]
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.vmin.nbytes + self.scale.nbytes
+
+    def __getitem__(self, ids) -> np.ndarray:
+        return self.codes[ids].astype(np.float32) * self.scale + self.vmin
+
+
+def save_embeddings(embeddings: np.ndarray, path: str, storage: str = "float32") -> str:
+    out_path = storage_path(path, storage)
+
+    if storage == "float32":
+        np.save(out_path, embeddings.astype(np.float32))
+    elif storage == "fp16":
+        np.save(out_path, embeddings.astype(np.float16))
+    elif storage == "sq8":
+        codes, params = encode_sq8(embeddings)
+        np.save(out_path, codes)
+        np.save(_sq8_params_path(path), params)
+    else:
+        raise ValueError(f"Unknown embedding storage: {storage}")
+
+    return out_path
+
+
+def load_embeddings_file(path: str, storage: str = "float32", mmap: bool = True):
+    """
+    float32 / fp16 load as (memory-mapped) arrays, sq8 as an SQ8Embeddings view.
+    Returns None when the file for that storage type hasn't been written.
+    """
+    in_path = storage_path(path, storage)
+    if not os.path.exists(in_path):
+        return None
+
+    mmap_mode = "r" if mmap else None
+    data = np.load(in_path, mmap_mode=mmap_mode)
+
+    if storage == "sq8":
+        return SQ8Embeddings(data, np.load(_sq8_params_path(path)))
+    return data
+
+
+def benchmark(
+    embeddings: np.ndarray,
+    queries: np.ndarray | None = None,
+    k: int = 10,
+    n_queries: int = 200,
+    seed: int = 0,
+) -> list[dict]:
+    """
+    Memory per storage type vs recall@k of top-k by dot product against
+    float32. Without `queries` (e.g. encoded eval questions), `n_queries`
+    rows are held out of the stored set and used as queries, so no query
+    finds itself.
+    """
+    # imported here: build_faiss -> load_index -> this module
+    from src.index.build_faiss import holdout_split
+
+    if queries is None:
+        held, keep = holdout_split(len(embeddings), n_queries, seed=seed)
+        queries, embeddings = embeddings[held], embeddings[keep]
+
+    exact_top = np.argpartition(-(queries @ embeddings.T), k, axis=1)[:, :k]
+    base_bytes = embeddings.astype(np.float32).nbytes
+
+    rows = []
+    for storage in STORAGE_TYPES:
+        if storage == "float32":
+            restored, nbytes = embeddings, base_bytes
+        elif storage == "fp16":
+            half = embeddings.astype(np.float16)
+            restored, nbytes = half.astype(np.float32), half.nbytes
+        else:
+            view = SQ8Embeddings(*encode_sq8(embeddings))
+            restored, nbytes = view[np.arange(len(embeddings))], view.nbytes
+
+        approx_top = np.argpartition(-(queries @ restored.T), k, axis=1)[:, :k]
+        recall = np.mean([
+            len(set(a) & set(e)) / k for a, e in zip(approx_top, exact_top)
+        ])
+
+        rows.append({
+            "storage": storage,
+            "bytes": int(nbytes),
+            "memory_saved_pct": round(100 * (1 - nbytes / base_bytes), 1),
+            f"recall_at_{k}": round(float(recall), 4),
+            "max_abs_error": round(float(np.abs(restored - embeddings).max()), 5),
+        })
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write quantized copies of the chunk embeddings")
+    parser.add_argument("--storage", choices=STORAGE_TYPES[1:], nargs="+", default=["fp16", "sq8"])
+    parser.add_argument("--input", default=EMBEDDINGS_PATH)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument(
+        "--questions",
+        default=None,
+        help="eval questions (one per line) to encode as benchmark queries instead of held-out rows",
+    )
+    args = parser.parse_args()
+
+    embeddings = np.load(args.input).astype(np.float32)
+
+    for storage in args.storage:
+        out_path = save_embeddings(embeddings, args.input, storage)
+        print(f"Saved {storage} embeddings → {out_path}")
+
+    print("\nStorage benchmark")
+    queries = None
+    if args.questions:
+        from src.index.build_faiss import encode_questions
+        queries = encode_questions(args.questions)
+
+    for row in benchmark(embeddings, queries, k=args.k):
+        print("  " + " | ".join(f"{key}={value}" for key, value in row.items()))
+
+
+if __name__ == "__main__":
+    main()
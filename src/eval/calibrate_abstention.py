@@ -0,0 +1,113 @@
+"""
+Fit the pre-generation abstention gate on logged traffic.
+
+    python -m src.eval.calibrate_abstention [--log PATH] [--output PATH]
+
+Each line of the feature log (written by src.llm.abstention.log_features)
+holds the retrieval features of one sampled LLM-answered request and
+whether the LLM abstained. Rotated files (<log>.1) are read too.
+A logistic regression predicts "the LLM abstained"; the threshold is the
+lowest probability at which, on a held-out split, at least
+--target-precision of the gated requests really were abstentions.
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+
+from src.config import get_section, resolve_path
+from src.llm.abstention import FEATURES
+
+
+def load_log(path: str):
+    X, y = [], []
+    for part in (f"{path}.1", path):
+        if not os.path.exists(part):
+            continue
+        with open(part) as f:
+            for line in f:
+                record = json.loads(line)
+                X.append([record["features"].get(name, 0.0) for name in FEATURES])
+                y.append(bool(record["abstained"]))
+    return np.array(X, dtype=np.float64), np.array(y, dtype=bool)
+
+
+def fit_gate(X: np.ndarray, y: np.ndarray, target_precision: float = 0.95, seed: int = 42) -> dict:
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.3, random_state=seed, stratify=y
+    )
+
+    # standardize for the fit, then fold the scaling back into raw-feature weights
+    mean, std = X_train.mean(axis=0), X_train.std(axis=0)
+    std[std == 0] = 1.0
+
+    model = LogisticRegression(class_weight="balanced", max_iter=1000)
+    model.fit((X_train - mean) / std, y_train)
+
+    coef = model.coef_[0] / std
+    intercept = float(model.intercept_[0] - np.sum(model.coef_[0] * mean / std))
+
+    probs = 1.0 / (1.0 + np.exp(-(X_val @ coef + intercept)))
+
+    # lowest threshold whose gated set is still precise enough
+    threshold = 1.0
+    for t in np.unique(probs)[::-1]:
+        gated = probs >= t
+        if y_val[gated].mean() < target_precision:
+            break
+        threshold = float(t)
+
+    gated = probs >= threshold
+    return {
+        "features": list(FEATURES),
+        "coef": {name: float(w) for name, w in zip(FEATURES, coef)},
+        "intercept": intercept,
+        "threshold": threshold,
+        "metrics": {
+            "n_samples": int(len(y)),
+            "abstention_rate": round(float(y.mean()), 4),
+            "val_gated_share": round(float(gated.mean()), 4),
+            "val_precision": round(float(y_val[gated].mean()), 4) if gated.any() else None,
+            # share of the LLM's abstentions the gate would have caught
+            "val_recall": round(float(gated[y_val].mean()), 4) if y_val.any() else None,
+        },
+    }
+
+
+def parse_args():
+    cfg = get_section("abstention")
+    parser = argparse.ArgumentParser(description="Calibrate the pre-generation abstention gate")
+    parser.add_argument("--log", default=cfg.get("log_path", "data/logs/abstention_features.jsonl"))
+    parser.add_argument("--output", default=cfg.get("model_path", "data/abstention_gate.json"))
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    parser.add_argument("--min-samples", type=int, default=200)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    X, y = load_log(resolve_path(args.log))
+    print(f"Loaded {len(y)} logged requests ({int(y.sum())} abstentions)")
+
+    if len(y) < args.min_samples or y.sum() < 10 or (~y).sum() < 10:
+        print("Not enough logged traffic (or too few of one class) to calibrate; gate left unchanged")
+        return
+
+    gate = fit_gate(X, y, target_precision=args.target_precision)
+
+    with open(resolve_path(args.output), "w") as f:
+        json.dump(gate, f, indent=2)
+
+    print(f"Gate saved → {args.output}")
+    for key, value in gate["metrics"].items():
+        print(f"  {key}: {value}")
+    print(f"  threshold: {gate['threshold']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
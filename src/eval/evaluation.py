@@ -1,3 +1,6 @@
+from src.llm.abstention import is_abstention
+
+
 def hallucination_score(
     answer: str,
     context_chunks: list[dict],
@@ -15,11 +18,7 @@ def hallucination_score(
         return {"score": 0.0, "is_hallucinated": True}
 
     # 2️⃣ Explicit abstention
-    if answer.strip().lower() in {
-        "i don't know.",
-        "i don't know based on the given context.",
-        "not enough information in the context."
-    }:
+    if is_abstention(answer):
         return {"score": 1.0, "is_hallucinated": False}
 
     # 3️⃣ No context
@@ -0,0 +1,133 @@
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+# "$1,200,000" -> "1200000", "2.5" stays whole, everything else splits on non-alphanumerics
+_NUMBER_COMMAS = re.compile(r"(?<=\d),(?=\d{3})")
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.\d+)?")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "did", "does", "do", "for",
+    "from", "has", "have", "how", "in", "is", "it", "its", "of", "on", "or",
+    "that", "the", "this", "to", "was", "were", "what", "when", "where",
+    "which", "who", "whom", "why", "with", "movie", "film",
+}
+
+
+def tokenize(text: str) -> list[str]:
+    text = _NUMBER_COMMAS.sub("", (text or "").lower())
+    return [
+        t for t in _TOKEN.findall(text)
+        if t not in STOPWORDS and (len(t) > 1 or t.isdigit())
+    ]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, addressed by vector_id.
+    Postings are CSR arrays: the chunks containing term t are
+    vector_ids[indptr[t]:indptr[t + 1]], with their full BM25 term weight
+    (idf included) precomputed in `weights`, so a query is a few slices
+    and one bincount.
+    """
+
+    def __init__(self, terms, indptr, vector_ids, weights, ntotal: int):
+        self.terms = terms
+        self.indptr = indptr
+        self.vector_ids = vector_ids
+        self.weights = weights
+        self.ntotal = int(ntotal)
+        self._term_ids = {term: i for i, term in enumerate(terms)}
+
+    @classmethod
+    def build(cls, vector_ids, texts, ntotal: int, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+        postings = {}
+        doc_lengths = np.zeros(ntotal, dtype=np.float32)
+
+        for vid, text in zip(vector_ids, texts):
+            vid = int(vid)
+            if not 0 <= vid < ntotal:
+                continue
+            tokens = tokenize(text)
+            doc_lengths[vid] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((vid, tf))
+
+        nonempty = doc_lengths[doc_lengths > 0]
+        n_docs = len(nonempty)
+        avg_len = float(nonempty.mean()) if n_docs else 1.0
+
+        terms = np.array(sorted(postings), dtype=object)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(postings[t]) for t in terms])
+
+        ids = np.empty(indptr[-1], dtype=np.int32)
+        weights = np.empty(indptr[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            entries = np.array(postings[term], dtype=np.float64)
+            vids, tf = entries[:, 0].astype(np.int64), entries[:, 1]
+
+            df = len(vids)
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = k1 * (1.0 - b + b * doc_lengths[vids] / avg_len)
+
+            ids[indptr[i]:indptr[i + 1]] = vids
+            weights[indptr[i]:indptr[i + 1]] = idf * tf * (k1 + 1.0) / (tf + norm)
+
+        return cls(terms, indptr, ids, weights, ntotal)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            terms=self.terms.astype(str),
+            indptr=self.indptr,
+            vector_ids=self.vector_ids,
+            weights=self.weights,
+            ntotal=np.int64(self.ntotal),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index | None":
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return cls(
+            data["terms"].astype(object),
+            data["indptr"],
+            data["vector_ids"],
+            data["weights"],
+            int(data["ntotal"]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def search(self, query: str, n: int, mask: np.ndarray | None = None):
+        """Top-n (vector_ids, scores), optionally restricted to vector_ids where mask is True."""
+        term_ids = {self._term_ids[t] for t in tokenize(query) if t in self._term_ids}
+        if not term_ids:
+            return [], []
+
+        ids = np.concatenate([self.vector_ids[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+        weights = np.concatenate([self.weights[self.indptr[t]:self.indptr[t + 1]] for t in term_ids])
+
+        if mask is not None:
+            keep = mask[ids]
+            ids, weights = ids[keep], weights[keep]
+            if not len(ids):
+                return [], []
+
+        # sum term weights per chunk over the matched postings only
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+
+        if len(unique_ids) > n:
+            top = np.argpartition(-scores, n)[:n]
+        else:
+            top = np.arange(len(unique_ids))
+        top = top[np.argsort(-scores[top])]
+
+        return unique_ids[top].tolist(), scores[top].tolist()
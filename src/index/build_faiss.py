@@ -1,36 +1,327 @@
+import argparse
+import json
 import os
+import time
+
 import faiss
 import numpy as np
+import pandas as pd
+
+from src.config import get_section, resolve_path
+from .bm25 import BM25Index
+from .film_shards import FilmShards
+from .load_index import apply_search_params, index_path, embeddings_path, film_shards_path, bm25_path
+from .memory_store import CHUNKS_META_PATH
+
+REPORT_PATH = "data/index_report.json"
+
+INDEX_TYPES = ("flat", "hnsw", "ivf-flat", "ivf-pq", "fp16", "sq8", "pq", "ivf-sq8")
+
+SCALAR_QUANTIZERS = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def _default_nlist(n_vectors: int) -> int:
+    # ~4*sqrt(N) lists, but keep >= 39 training points per centroid
+    nlist = int(4 * np.sqrt(n_vectors))
+    return max(1, min(nlist, n_vectors // 39))
+
+
+def _check_pq_m(dim: int, pq_m: int) -> None:
+    if dim % pq_m != 0:
+        raise ValueError(f"pq_m={pq_m} must divide the embedding dim {dim}")
+
+
+def index_bytes(index) -> int:
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def build_index(
+    embeddings: np.ndarray,
+    index_type: str = "flat",
+    nlist: int | None = None,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+    pq_m: int = 48,
+    pq_bits: int = 8,
+    train_size: int = 50_000,
+    seed: int = 42,
+):
+    n, dim = embeddings.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(dim)
+
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = ef_construction
+
+    elif index_type in SCALAR_QUANTIZERS:
+        index = faiss.IndexScalarQuantizer(
+            dim, SCALAR_QUANTIZERS[index_type], faiss.METRIC_INNER_PRODUCT
+        )
+
+    elif index_type == "pq":
+        _check_pq_m(dim, pq_m)
+        index = faiss.IndexPQ(dim, pq_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+
+    elif index_type in {"ivf-flat", "ivf-pq", "ivf-sq8"}:
+        nlist = nlist or _default_nlist(n)
+        quantizer = faiss.IndexFlatIP(dim)
+
+        if index_type == "ivf-flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        elif index_type == "ivf-sq8":
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        else:
+            _check_pq_m(dim, pq_m)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits, faiss.METRIC_INNER_PRODUCT)
+
+    else:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample_size = min(train_size, n)
+        sample = embeddings[rng.choice(n, sample_size, replace=False)]
+        print(f"Training {index_type} on {sample_size} vectors...")
+        index.train(sample)
+
+    index.add(embeddings)
+    assert index.ntotal == n
+
+    return index
+
+
+def _per_query_latency_ms(index, queries: np.ndarray, k: int) -> np.ndarray:
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def encode_questions(path: str) -> np.ndarray:
+    """Report queries from a file of eval questions, one per line, encoded like live queries."""
+    from src.embedding.embedding_model import get_embedding_model
 
-EMBEDDINGS_PATH = "data/embeddings/embeddings.npy"
-INDEX_PATH = "data/index.faiss"
+    with open(path) as f:
+        questions = [line.strip() for line in f if line.strip()]
+    queries = get_embedding_model().encode(
+        questions, normalize_embeddings=True, show_progress_bar=False
+    )
+    return np.ascontiguousarray(queries, dtype="float32")
+
+
+def holdout_split(n_vectors: int, n_queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (query rows, indexed rows). Queries must not be in the index under test:
+    a self-query's nearest neighbour is itself, which flatters lossy indexes.
+    """
+    rng = np.random.default_rng(seed)
+    n_queries = min(n_queries, n_vectors // 2)
+    held = rng.choice(n_vectors, n_queries, replace=False)
+    keep = np.setdiff1d(np.arange(n_vectors), held)
+    return held, keep
+
+
+def build_report(
+    index,
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    rescore_oversample: int = 4,
+) -> dict:
+    """
+    recall@k of `index` (built over `embeddings`) against exact (flat)
+    search, index size and per-query latency. `queries` must not come from
+    `embeddings`: use held-out vectors or encoded eval questions.
+    """
+
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    n_queries = queries.shape[0]
+
+    flat = faiss.IndexFlatIP(embeddings.shape[1])
+    flat.add(embeddings)
+
+    _, exact_ids = flat.search(queries, k)
+    _, approx_ids = index.search(queries, k)
+
+    recall = np.mean([
+        len(set(a[a != -1]) & set(e)) / k
+        for a, e in zip(approx_ids, exact_ids)
+    ])
+
+    # Recall after re-scoring an oversampled shortlist on the exact vectors,
+    # as query_index does for lossy indexes
+    _, shortlist = index.search(queries, k * rescore_oversample)
+    rescored_recall = []
+    for q, ids, e in zip(queries, shortlist, exact_ids):
+        ids = ids[ids != -1]
+        top = ids[np.argsort(-(embeddings[ids] @ q))[:k]]
+        rescored_recall.append(len(set(top) & set(e)) / k)
+
+    flat_ms = _per_query_latency_ms(flat, queries, k)
+    index_ms = _per_query_latency_ms(index, queries, k)
+
+    flat_bytes = index_bytes(flat)
+    nbytes = index_bytes(index)
+
+    return {
+        "k": k,
+        "n_queries": n_queries,
+        f"recall_at_{k}": round(float(recall), 4),
+        f"rescored_recall_at_{k}": round(float(np.mean(rescored_recall)), 4),
+        "rescore_oversample": rescore_oversample,
+        "index_bytes": nbytes,
+        "flat_index_bytes": flat_bytes,
+        "memory_saved_pct": round(100 * (1 - nbytes / flat_bytes), 1),
+        "flat_latency_p50_ms": round(float(np.percentile(flat_ms, 50)), 4),
+        "flat_latency_p95_ms": round(float(np.percentile(flat_ms, 95)), 4),
+        "latency_p50_ms": round(float(np.percentile(index_ms, 50)), 4),
+        "latency_p95_ms": round(float(np.percentile(index_ms, 95)), 4),
+    }
+
+
+def build_film_shards(n_vectors: int) -> FilmShards:
+    meta_path = get_section("metadata").get("chunks_meta_path", CHUNKS_META_PATH)
+    meta = pd.read_parquet(resolve_path(meta_path), columns=["vector_id", "title"])
+    meta = meta[meta["vector_id"] < n_vectors]
+    return FilmShards.build(meta["vector_id"].to_numpy(), meta["title"].tolist())
+
+
+def build_bm25(n_vectors: int) -> BM25Index:
+    meta_path = get_section("metadata").get("chunks_meta_path", CHUNKS_META_PATH)
+    meta = pd.read_parquet(resolve_path(meta_path), columns=["vector_id", "text"])
+    cfg = get_section("bm25")
+    return BM25Index.build(
+        meta["vector_id"].to_numpy(),
+        meta["text"].tolist(),
+        ntotal=n_vectors,
+        k1=cfg.get("k1", 1.2),
+        b=cfg.get("b", 0.75),
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the FAISS index over chunk embeddings")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default ~4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, default=16, help="IVF lists probed for the report")
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW search depth for the report")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers (must divide dim)")
+    parser.add_argument("--pq-bits", type=int, default=8)
+    parser.add_argument("--train-size", type=int, default=50_000)
+    parser.add_argument("--report-k", type=int, default=10)
+    parser.add_argument("--report-queries", type=int, default=200, help="held-out vectors for the report")
+    parser.add_argument(
+        "--report-questions",
+        default=None,
+        help="eval questions (one per line) to encode as report queries instead of held-out vectors",
+    )
+    parser.add_argument("--rescore-oversample", type=int, default=4)
+    parser.add_argument("--no-report", action="store_true")
+    parser.add_argument("--no-shards", action="store_true", help="skip the per-film vector_id map")
+    parser.add_argument("--no-bm25", action="store_true", help="skip the lexical index over chunk texts")
+    parser.add_argument("--output", default=None, help="defaults to index.path in config.yaml")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
     print("Loading embeddings...")
-    embeddings = np.load(EMBEDDINGS_PATH)
+    embeddings = np.load(embeddings_path())
 
     assert embeddings.dtype == np.float32
     assert embeddings.ndim == 2
-    assert embeddings.shape[1] == 384
 
     print(f"Loaded embeddings: {embeddings.shape}")
 
     print("Normalizing embeddings (L2)")
     faiss.normalize_L2(embeddings)
 
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatIP(dim)
-
-    index.add(embeddings)
-    assert index.ntotal == embeddings.shape[0]
+    index = build_index(
+        embeddings,
+        index_type=args.index_type,
+        nlist=args.nlist,
+        hnsw_m=args.hnsw_m,
+        ef_construction=args.ef_construction,
+        pq_m=args.pq_m,
+        pq_bits=args.pq_bits,
+        train_size=args.train_size,
+    )
 
-    os.makedirs("data", exist_ok=True)
-    faiss.write_index(index, INDEX_PATH)
+    output = args.output or index_path()
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    faiss.write_index(index, output)
 
-    print(f"FAISS index built & saved to {INDEX_PATH}")
+    print(f"FAISS {args.index_type} index built & saved to {output}")
     print(f"Total vectors indexed: {index.ntotal}")
 
+    if not args.no_shards:
+        shards = build_film_shards(index.ntotal)
+        shards.save(film_shards_path())
+        print(f"Film shards: {len(shards)} films → {film_shards_path()}")
+
+    if not args.no_bm25:
+        bm25 = build_bm25(index.ntotal)
+        bm25.save(bm25_path())
+        print(f"BM25 index: {len(bm25)} terms → {bm25_path()}")
+
+    if args.no_report:
+        return
+
+    if args.report_questions:
+        queries, source = encode_questions(args.report_questions), "eval_questions"
+        report_index, base = index, embeddings
+    else:
+        # rebuild without the held-out rows so no query is its own neighbour
+        held, keep = holdout_split(embeddings.shape[0], args.report_queries)
+        queries, source = embeddings[held], "held_out_vectors"
+        base = np.ascontiguousarray(embeddings[keep])
+        print(f"Building a report index without {len(held)} held-out query vectors...")
+        report_index = build_index(
+            base,
+            index_type=args.index_type,
+            nlist=args.nlist,
+            hnsw_m=args.hnsw_m,
+            ef_construction=args.ef_construction,
+            pq_m=args.pq_m,
+            pq_bits=args.pq_bits,
+            train_size=args.train_size,
+        )
+
+    apply_search_params(report_index, nprobe=args.nprobe, ef_search=args.ef_search)
+    report = {
+        "index_type": args.index_type,
+        "ntotal": int(index.ntotal),
+        "nprobe": args.nprobe,
+        "ef_search": args.ef_search,
+        "query_source": source,
+        **build_report(
+            report_index,
+            base,
+            queries,
+            k=args.report_k,
+            rescore_oversample=args.rescore_oversample,
+        ),
+    }
+
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print("\nBuild report")
+    for key, value in report.items():
+        print(f"  {key}: {value}")
+
 
 if __name__ == "__main__":
     main()
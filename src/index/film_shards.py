@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+
+from .search_filters import normalize_title
+
+
+class FilmShards:
+    """
+    vector_id ranges per film, stored CSR-style: the ids of film i are
+    vector_ids[offsets[i]:offsets[i + 1]]. Title-scoped queries score just
+    those few hundred vectors by exact dot product instead of searching
+    the whole index.
+    """
+
+    def __init__(self, titles: np.ndarray, offsets: np.ndarray, vector_ids: np.ndarray):
+        self.titles = titles
+        self.offsets = offsets
+        self.vector_ids = vector_ids
+        self._position = {title: i for i, title in enumerate(titles)}
+
+    @classmethod
+    def build(cls, vector_ids, titles) -> "FilmShards":
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        keys = np.array([normalize_title(t) for t in titles], dtype=object)
+
+        keep = keys != ""
+        vector_ids, keys = vector_ids[keep], keys[keep]
+
+        order = np.argsort(keys.astype(str), kind="stable")
+        vector_ids, keys = vector_ids[order], keys[order]
+
+        shard_titles, starts = np.unique(keys.astype(str), return_index=True)
+        offsets = np.append(starts, len(keys)).astype(np.int64)
+
+        return cls(shard_titles.astype(object), offsets, vector_ids)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            titles=self.titles.astype(str),
+            offsets=self.offsets,
+            vector_ids=self.vector_ids,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "FilmShards | None":
+        if not os.path.exists(path):
+            return None
+        data = np.load(path)
+        return cls(data["titles"].astype(object), data["offsets"], data["vector_ids"])
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def __contains__(self, title: str | None) -> bool:
+        return normalize_title(title) in self._position
+
+    def ids_for(self, title: str | None) -> np.ndarray | None:
+        pos = self._position.get(normalize_title(title))
+        if pos is None:
+            return None
+        return self.vector_ids[self.offsets[pos]:self.offsets[pos + 1]]
@@ -1,16 +1,38 @@
+import os
 import numpy as np
 import faiss
 import re
 from typing import Optional, Dict,List
-from .load_index import load_faiss_index
+from .load_index import (
+    load_faiss_index,
+    load_embeddings,
+    index_path,
+    search_parameters,
+    film_shards_path,
+    bm25_path,
+)
+from .search_filters import SearchFilters
+from .film_shards import FilmShards
+from .title_resolver import get_title_resolver, resolve_title
+from .bm25 import BM25Index
 from .metadata_store import MetadataStore
+from .memory_store import InMemoryMetadataStore
 from ..document.db_save import MetadataStore2
-import  api.core.model_store as model_store
-from ..embedding.embedding_model import load_embedding_model
+from ..embedding.embedding_model import encode_query
+from ..retrieval.scoring import reciprocal_rank_fusion
+from ..config import get_section
+from ..metrics import timed, timed_stage
 
 _faiss_index = None
+_embeddings = None
+_exact_embeddings = None
 _metadata_store = None
 _metadata_store2 =None
+_search_filters = None
+_film_shards = None
+_bm25 = None
+
+POST_FILTER_OVERSAMPLE = 10
 
 
 INTENT_SECTION_FILTERS = {
@@ -70,27 +92,32 @@ INTENT_SECTION_FILTERS = {
 }
 
 
-def extract_movie_from_query(query: str) -> Dict[str, Optional[str]]:
-  
+def extract_movie_from_query(
+    query: str,
+    query_embedding: Optional[np.ndarray] = None,
+) -> Dict[str, Optional[str]]:
+    """
+    Catalog title mentioned in the query, resolved by the fuzzy title index
+    so multi-word and misspelled titles come back whole ("the dark night
+    rises" -> "The Dark Knight Rises"). A quoted title is taken as-is when
+    it isn't in the catalog; retrieval then finds nothing for it instead
+    of answering from another film.
+    """
     result = {
         "movie_title": None,
+        "film_id": None,
+        "title_score": None,
     }
 
     quoted = re.findall(r'"([^"]+)"', query)
-    if quoted:
-        result["movie_title"] = quoted[0].strip()
+    match = resolve_title(quoted[0] if quoted else query, query_embedding)
 
-    if result["movie_title"] is None:
-        tokens = re.findall(r'\b[A-Z][a-zA-Z0-9:-]+\b', query)
-        stopwords = {
-            "Who", "What", "When", "Where", "Which",
-            "Directed", "Director", "Movie", "Film"
-        }
-        candidates = [t for t in tokens if t not in stopwords]
-
-        if candidates:
-            candidates.sort(key=len)
-            result["movie_title"] = candidates[0]
+    if match is not None:
+        result["movie_title"] = match["title"]
+        result["film_id"] = match["film_id"]
+        result["title_score"] = match["score"]
+    elif quoted:
+        result["movie_title"] = quoted[0].strip()
 
     return result
 
@@ -99,21 +126,133 @@ def _get_faiss_index():
     if _faiss_index is None:
         _faiss_index = load_faiss_index()
     return _faiss_index
- 
+
+
+def index_version() -> str | None:
+    """Changes whenever the index file on disk is rebuilt."""
+    try:
+        stat = os.stat(index_path())
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _get_embeddings():
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = load_embeddings()
+    return _embeddings
+
+
+def _get_exact_embeddings():
+    global _exact_embeddings
+    if _exact_embeddings is None:
+        _exact_embeddings = load_embeddings(storage="float32")
+    return _exact_embeddings
+
+
+def _should_rescore(index) -> bool:
+    # Only compressed / approximate indexes need their shortlist re-scored
+    if not get_section("index").get("rescore", True):
+        return False
+    return not isinstance(index, faiss.IndexFlat)
+
+
+def _rescore_oversample() -> int:
+    return int(get_section("index").get("rescore_oversample", 4))
+
+
+def _rescore(query_embedding: np.ndarray, vector_ids, scores, keep: int):
+    """Re-rank an ANN shortlist by exact dot product on the float32 vectors."""
+    exact = _get_exact_embeddings()
+    if exact is None:
+        return vector_ids[:keep], scores[:keep]
+
+    ids = np.asarray(vector_ids, dtype="int64")
+    exact_scores = np.asarray(exact[ids], dtype="float32") @ query_embedding
+
+    order = np.argsort(-exact_scores)[:keep]
+    return ids[order].tolist(), exact_scores[order].tolist()
+
+
+def get_chunk_vectors(vector_ids: List[int]) -> np.ndarray:
+    """
+    Stored (L2-normalized) chunk vectors keyed by vector_id.
+    Reads the memory-mapped embeddings matrix, falling back to the FAISS index.
+    """
+    ids = np.asarray(vector_ids, dtype="int64")
+
+    embeddings = _get_embeddings()
+    if embeddings is not None:
+        return np.asarray(embeddings[ids], dtype="float32")
+
+    return _get_faiss_index().reconstruct_batch(ids)
+
+
+def _metadata_backend() -> str:
+    return get_section("metadata").get("backend", "postgres")
+
 
 def _get_metadata_store():
     global _metadata_store
     if _metadata_store is None:
-        _metadata_store = MetadataStore()
+        if _metadata_backend() == "memory":
+            _metadata_store = InMemoryMetadataStore()
+        else:
+            _metadata_store = MetadataStore()
     return _metadata_store
 
 def _get_metadata_store2():
     global _metadata_store2
     if _metadata_store2 is None:
-        _metadata_store2 = MetadataStore2()
+        if _metadata_backend() == "memory":
+            # one in-process table serves both chunk and document lookups
+            _metadata_store2 = _get_metadata_store()
+        else:
+            _metadata_store2 = MetadataStore2()
     return _metadata_store2
 
 
+def _get_search_filters():
+    global _search_filters
+    if _search_filters is None:
+        _search_filters = SearchFilters(
+            _get_metadata_store().fetch_filter_columns(),
+            ntotal=_get_faiss_index().ntotal,
+            section_filters=INTENT_SECTION_FILTERS,
+        )
+    return _search_filters
+
+
+def _get_film_shards():
+    global _film_shards
+    if _film_shards is None:
+        # an empty map when build_faiss was run with --no-shards
+        _film_shards = FilmShards.load(film_shards_path()) or FilmShards.build([], [])
+    return _film_shards
+
+
+def _get_bm25():
+    global _bm25
+    if _bm25 is None and get_section("bm25").get("enabled", True):
+        # None until build_faiss has written the lexical index
+        _bm25 = BM25Index.load(bm25_path())
+    return _bm25
+
+
+def warm_up() -> None:
+    """Load the index, stored vectors and metadata backend ahead of the first query."""
+    _get_faiss_index()
+    _get_embeddings()
+    # store2 owns the `meta` table the joined Postgres fetch reads from
+    _get_metadata_store2()
+    _get_metadata_store()
+    _get_search_filters()
+    _get_film_shards()
+    _get_bm25()
+    get_title_resolver()
+
+
 
 from typing import List, Dict
 
@@ -224,154 +363,238 @@ def rewrite_query_by_intent(
     return q
 
 
-def infer_movie_title_from_results(doc_by_id) -> str | None:
-    titles = [doc.title for doc in doc_by_id.values() if doc and doc.title]
-    if not titles:
-        return None
+def _result_from_row(row, score: float) -> Dict:
+    return {
+        "score": float(score),
+        "vector_id": row.vector_id,
+        "chunk_id": row.chunk_id,
+        "doc_id": row.doc_id,
+        "title": row.title,
+        "text": row.text,
+        "source": row.source,
+        "section": row.section,
+        "start_char": row.start_char,
+        "end_char": row.end_char,
+    }
 
-    return max(set(titles), key=titles.count)
 
-def query_index(
+@timed_stage("faiss_search")
+def _search(
     query_embedding: np.ndarray,
-    query_type: str,
-    k: int = 5
-) -> List[Dict]:
-
-    if query_embedding.ndim == 1:
-        query_embedding = query_embedding.reshape(1, -1)
+    n: int,
+    query_type: str = "general",
+    title: str | None = None,
+):
+    """
+    Top-n (vector_ids, scores) for a normalized (1, dim) query, restricted to
+    the vectors allowed for this intent (and film, when given).
+    """
+    index = _get_faiss_index()
+    filters = _get_search_filters()
+    selector = filters.selector(query_type, title)
 
-    query_embedding = query_embedding.astype("float32")
-    faiss.normalize_L2(query_embedding)
+    # IndexPQ rejects SearchParameters: over-fetch and mask afterwards instead
+    post_filter = selector is not None and isinstance(index, faiss.IndexPQ)
 
-    index = _get_faiss_index()
+    rescore = _should_rescore(index)
+    n_search = n * _rescore_oversample() if rescore else n
+    if post_filter:
+        n_search *= POST_FILTER_OVERSAMPLE
 
-    scores, vector_ids = index.search(query_embedding, k * 3)
+    if selector is None or post_filter:
+        scores, vector_ids = index.search(query_embedding, n_search)
+    else:
+        scores, vector_ids = index.search(
+            query_embedding,
+            n_search,
+            params=search_parameters(index, selector),
+        )
 
     scores = scores[0]
     vector_ids = vector_ids[0].tolist()
 
     valid = [(vid, score) for vid, score in zip(vector_ids, scores) if vid != -1]
+    if post_filter:
+        mask = filters.mask(query_type, title)
+        valid = [(vid, score) for vid, score in valid if mask[vid]]
     if not valid:
-        return []
+        return [], []
 
     vector_ids, scores = zip(*valid)
 
-    store = _get_metadata_store()
-    store2 = _get_metadata_store2()
+    if rescore:
+        return _rescore(query_embedding[0], vector_ids, scores, n)
 
-    vec_rows = store.fetch_by_vector_ids(list(vector_ids))
+    return list(vector_ids[:n]), list(scores[:n])
 
-    vec_by_vid = {}
-    doc_ids = set()
 
-    for row in vec_rows:
-        vec_by_vid[row.vector_id] = {
-            "chunk_id": row.chunk_id,
-            "doc_id": row.doc_id,
-        }
-        doc_ids.add(row.doc_id)
+@timed_stage("faiss_search")
+def _search_film(
+    query_embedding: np.ndarray,
+    n: int,
+    title: str,
+    query_type: str = "general",
+):
+    """Exact top-n within one film's shard, honouring the intent's section filter."""
+    ids = _get_film_shards().ids_for(title)
+    if ids is None or not len(ids):
+        return [], []
+
+    section_mask = _get_search_filters().section_mask(query_type)
+    if section_mask is not None:
+        ids = ids[section_mask[ids]]
+        if not len(ids):
+            return [], []
+
+    vectors = _get_exact_embeddings()
+    vectors = vectors[ids] if vectors is not None else get_chunk_vectors(ids)
+    scores = np.asarray(vectors, dtype="float32") @ query_embedding[0]
+
+    if len(ids) > n:
+        top = np.argpartition(-scores, n)[:n]
+    else:
+        top = np.arange(len(ids))
+    top = top[np.argsort(-scores[top])]
 
-    doc_rows = store2.fetch_by_doc_ids(list(doc_ids))
-    doc_by_id = {row.doc_id: row for row in doc_rows}
+    return ids[top].tolist(), scores[top].tolist()
 
-    allowed_sections = INTENT_SECTION_FILTERS.get(query_type)
 
-    require_same_title = query_type == "summary"
-    inferred_movie_title = None
+@timed_stage("lexical_fusion")
+def _fuse_lexical(
+    query_embedding: np.ndarray,
+    lexical_query: str,
+    vector_ids,
+    k: int,
+    query_type: str,
+    title: str | None,
+):
+    """
+    Reciprocal-rank fusion of the dense hits with BM25 hits drawn from the
+    same section / film scope. Returns (vector_ids, dense scores, fusion
+    scores, BM25 ranks); "score" keeps its cosine meaning for the stages
+    downstream, and the BM25 rank (1-based, None when BM25 missed the hit)
+    lets rerank admit strong lexical matches explicitly.
+    """
+    mask = _get_search_filters().mask(query_type, title)
+    lexical_ids, _ = _get_bm25().search(lexical_query, k, mask=mask)
+
+    rrf_k = get_section("bm25").get("rrf_k", 60)
+    fused = reciprocal_rank_fusion([list(vector_ids), lexical_ids], k=rrf_k)[:k]
+
+    ids = [vid for vid, _ in fused]
+    scores = get_chunk_vectors(ids) @ query_embedding[0]
+    lexical_rank = {vid: rank for rank, vid in enumerate(lexical_ids, start=1)}
+    return ids, scores.tolist(), [score for _, score in fused], [lexical_rank.get(vid) for vid in ids]
 
-    if require_same_title:
-        inferred_movie_title = infer_movie_title_from_results(doc_by_id)
 
-    results = []
+def query_index(
+    query_embedding: np.ndarray,
+    query_type: str,
+    k: int = 5,
+    movie_title: str | None = None,
+    lexical_query: str | None = None,
+) -> List[Dict]:
 
-    for vid, score in zip(vector_ids, scores):
-        vec = vec_by_vid.get(vid)
-        if not vec:
-            continue
-
-        doc = doc_by_id.get(vec["doc_id"])
-        if not doc:
-            continue
-
-        if allowed_sections is not None:
-            section = (doc.section or "").lower()
-            if not any(s in section for s in allowed_sections):
-                continue
-
-        if require_same_title and inferred_movie_title:
-            if doc.title.lower() != inferred_movie_title.lower():
-                continue
-
-        results.append({
-            "score": float(score),
-            "vector_id": vid,
-            "chunk_id": vec["chunk_id"],
-            "doc_id": vec["doc_id"],
-            "title": doc.title,
-            "text": doc.text,
-            "source": doc.source,
-            "section": doc.section,
-            "start_char": doc.start_char,
-            "end_char": doc.end_char,
-        })
-
-        if len(results) >= k:
-            break
-
-    if not results:
-        for vid, score in zip(vector_ids, scores):
-            vec = vec_by_vid.get(vid)
-            doc = doc_by_id.get(vec["doc_id"]) if vec else None
-            if not doc:
-                continue
-
-            results.append({
-                "score": float(score),
-                "vector_id": vid,
-                "chunk_id": vec["chunk_id"],
-                "doc_id": vec["doc_id"],
-                "title": doc.title,
-                "text": doc.text,
-                "source": doc.source,
-                "section": doc.section,
-                "start_char": doc.start_char,
-                "end_char": doc.end_char,
-            })
-
-            if len(results) >= k:
-                break
+    if query_embedding.ndim == 1:
+        query_embedding = query_embedding.reshape(1, -1)
+
+    query_embedding = query_embedding.astype("float32")
+    faiss.normalize_L2(query_embedding)
+
+    vector_ids, scores = [], []
+    # (intent, film) the hits were actually drawn from, for the lexical side
+    scope = (query_type, movie_title)
+
+    # A known film is searched locally: only its own vectors are scored
+    if movie_title and movie_title in _get_film_shards():
+        vector_ids, scores = _search_film(query_embedding, k, movie_title, query_type)
+        if not vector_ids:
+            vector_ids, scores = _search_film(query_embedding, k, movie_title)
+            scope = ("general", movie_title)
+    elif movie_title:
+        # A named film with no indexed chunks (an unknown quoted title, or a catalog
+        # film never ingested) gets no passages rather than other films' passages
+        if _get_search_filters().title_mask(movie_title) is None:
+            return []
+
+        # no shard file (built with --no-shards): filter by title inside the search
+        vector_ids, scores = _search(query_embedding, k, query_type, movie_title)
+        if not vector_ids:
+            vector_ids, scores = _search(query_embedding, k, title=movie_title)
+            scope = ("general", movie_title)
+
+    if not vector_ids:
+        # Section filters are applied inside the search, so k hits come back valid
+        vector_ids, scores = _search(query_embedding, k, query_type)
+        scope = (query_type, None)
+
+        # Summaries stay within the film most of the top hits belong to
+        if query_type == "summary" and vector_ids:
+            inferred_movie_title = _get_search_filters().majority_title(vector_ids)
+            if inferred_movie_title in _get_film_shards():
+                vector_ids, scores = _search_film(query_embedding, k, inferred_movie_title, query_type)
+            elif inferred_movie_title:
+                vector_ids, scores = _search(query_embedding, k, query_type, inferred_movie_title)
+            scope = (query_type, inferred_movie_title)
+
+    if not vector_ids:
+        vector_ids, scores = _search(query_embedding, k)
+        scope = ("general", None)
+
+    fusion_scores, lexical_ranks = None, None
+    if lexical_query and _get_bm25() is not None:
+        vector_ids, scores, fusion_scores, lexical_ranks = _fuse_lexical(
+            query_embedding, lexical_query, vector_ids, k, *scope
+        )
+
+    with timed("metadata_fetch"):
+        rows = _get_metadata_store().fetch_joined_by_vector_ids(list(vector_ids))
+    row_by_vid = {row.vector_id: row for row in rows}
+
+    results = []
+    for i, (vid, score) in enumerate(zip(vector_ids, scores)):
+        row = row_by_vid.get(vid)
+        if row:
+            result = _result_from_row(row, score)
+            if fusion_scores is not None:
+                result["fusion_score"] = fusion_scores[i]
+                result["lexical_rank"] = lexical_ranks[i]
+            results.append(result)
 
     return results
 
 
 def query_text(query: str, k: int = 5) -> List[Dict]:
     
-    query_type = classify_query_intent(query)
-    entity = extract_movie_from_query(query)
+    with timed("intent"):
+        query_type = classify_query_intent(query)
+        rewritten_query = rewrite_query_by_intent(query, query_type)
+
+    with timed("query_encode"):
+        query_embedding = encode_query(rewritten_query)
+
+    with timed("title_resolve"):
+        entity = extract_movie_from_query(query, query_embedding)
     if entity["movie_title"]:
         retrieval_filter = entity["movie_title"]
     else:
         retrieval_filter = None
 
-    rewritten_query = rewrite_query_by_intent(query, query_type)
-
-    model =  load_embedding_model()
-    if model is None:
-        raise RuntimeError("Embedding model not loaded")
-
-    query_embedding = model.encode(
-        rewritten_query,
-        normalize_embeddings=True,
-        show_progress_bar=False,
+    # BM25 sees the user's own words, not the intent boilerplate added for the encoder
+    results = query_index(
+        query_embedding,
+        query_type,
+        k=k,
+        movie_title=retrieval_filter,
+        lexical_query=query,
     )
 
-    results = query_index(query_embedding, query_type, k=k)
-
     for r in results:
         r["query_type"] = query_type
         r["original_query"] = query
         r["rewritten_query"] = rewritten_query
         r["extracted_movie"] = retrieval_filter
+        r["query_embedding"] = query_embedding
 
     return results
 
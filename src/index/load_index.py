@@ -1,8 +1,95 @@
 import faiss
 
+from src.config import get_section, resolve_path
+from src.embedding.quantize import load_embeddings_file
+
 INDEX_PATH = "data/index.faiss"
+EMBEDDINGS_PATH = "data/embeddings/embeddings.npy"
+FILM_SHARDS_PATH = "data/film_shards.npz"
+BM25_PATH = "data/bm25.npz"
+
+
+def index_path() -> str:
+    return str(resolve_path(get_section("index").get("path", INDEX_PATH)))
+
+
+def embeddings_path() -> str:
+    return str(resolve_path(get_section("index").get("embeddings_path", EMBEDDINGS_PATH)))
+
+
+def film_shards_path() -> str:
+    return str(resolve_path(get_section("index").get("film_shards_path", FILM_SHARDS_PATH)))
+
+
+def bm25_path() -> str:
+    return str(resolve_path(get_section("bm25").get("path", BM25_PATH)))
+
+
+def _read_flags(path: str, mmap: bool) -> int:
+    if not mmap:
+        return 0
+
+    # Map the index file instead of copying it onto the heap: the OS shares
+    # the pages across uvicorn workers and load time no longer grows with
+    # index size. IVF inverted lists are mapped through the on-disk
+    # invlists reader (IO_FLAG_MMAP); flat / HNSW code arrays need
+    # IO_FLAG_MMAP_IFC, which the IVF reader rejects.
+    with open(path, "rb") as f:
+        is_ivf = f.read(4).startswith(b"Iw")
+
+    if is_ivf:
+        flags = faiss.IO_FLAG_MMAP
+    else:
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
 
+    return flags | faiss.IO_FLAG_READ_ONLY
+
+
+def apply_search_params(index, nprobe: int | None = None, ef_search: int | None = None):
+    """Query-time knobs: IVF lists probed and HNSW search depth (ignored by other types)."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = nprobe
+
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None and ef_search:
+        hnsw.efSearch = ef_search
 
-def load_faiss_index():
-    index = faiss.read_index(INDEX_PATH)
     return index
+
+
+def search_parameters(index, selector):
+    """SearchParameters carrying an ID selector plus the index's own nprobe / efSearch."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.efSearch)
+
+    return faiss.SearchParameters(sel=selector)
+
+
+def load_faiss_index(path: str | None = None, mmap: bool | None = None):
+    cfg = get_section("index")
+    if mmap is None:
+        mmap = cfg.get("mmap", True)
+
+    path = path or index_path()
+    index = faiss.read_index(path, _read_flags(path, mmap))
+
+    return apply_search_params(
+        index,
+        nprobe=cfg.get("nprobe"),
+        ef_search=cfg.get("ef_search"),
+    )
+
+
+def load_embeddings(mmap: bool = True, storage: str | None = None):
+    """
+    Chunk vectors in the configured `index.vector_storage` (float32 / fp16 / sq8).
+    Pass storage="float32" for the exact copy used when re-scoring.
+    """
+    storage = storage or get_section("index").get("vector_storage", "float32")
+    return load_embeddings_file(embeddings_path(), storage=storage, mmap=mmap)
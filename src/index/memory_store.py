@@ -0,0 +1,130 @@
+from collections import namedtuple
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from src.config import get_section, resolve_path
+
+CHUNKS_META_PATH = "data/embeddings/chunks_meta.parquet"
+DOCUMENTS_PATH = "data/processed/documents.csv"
+
+CHUNK_COLUMNS = ("vector_id", "chunk_id", "doc_id")
+DOC_COLUMNS = (
+    "doc_id",
+    "title",
+    "source",
+    "section",
+    "start_char",
+    "end_char",
+    "text",
+)
+
+# Same attribute interface as the rows returned by the Postgres stores
+ChunkRow = namedtuple("ChunkRow", CHUNK_COLUMNS)
+DocRow = namedtuple("DocRow", DOC_COLUMNS)
+JoinedRow = namedtuple("JoinedRow", CHUNK_COLUMNS + DOC_COLUMNS[1:])
+FilterRow = namedtuple("FilterRow", ("vector_id", "section", "title"))
+
+
+class InMemoryMetadataStore:
+    """
+    In-process replacement for MetadataStore + MetadataStore2.
+    Chunk columns are arrays indexed directly by vector_id, document
+    columns are arrays addressed through a doc_id -> position map.
+    """
+
+    def __init__(
+        self,
+        chunks_meta_path: str | None = None,
+        documents_path: str | None = None,
+    ):
+        cfg = get_section("metadata")
+        chunks_meta_path = chunks_meta_path or cfg.get("chunks_meta_path", CHUNKS_META_PATH)
+        documents_path = documents_path or cfg.get("documents_path", DOCUMENTS_PATH)
+
+        chunks = pd.read_parquet(resolve_path(chunks_meta_path), columns=list(CHUNK_COLUMNS))
+        docs = pd.read_csv(resolve_path(documents_path), usecols=list(DOC_COLUMNS))
+
+        self._load_chunks(chunks)
+        self._load_docs(docs)
+
+    def _load_chunks(self, chunks: pd.DataFrame) -> None:
+        vector_ids = chunks["vector_id"].to_numpy(dtype=np.int64)
+        size = int(vector_ids.max()) + 1 if len(vector_ids) else 0
+
+        self._present = np.zeros(size, dtype=bool)
+        self._chunk_id = np.empty(size, dtype=object)
+        self._doc_id = np.empty(size, dtype=object)
+
+        self._present[vector_ids] = True
+        self._chunk_id[vector_ids] = chunks["chunk_id"].to_numpy(dtype=object)
+        self._doc_id[vector_ids] = chunks["doc_id"].to_numpy(dtype=object)
+
+    def _load_docs(self, docs: pd.DataFrame) -> None:
+        # Mirrors `ON CONFLICT (doc_id) DO NOTHING`: first row wins
+        docs = docs.drop_duplicates(subset="doc_id", keep="first")
+        docs = docs.astype(object).where(docs.notna(), None)
+
+        self._doc_pos = {doc_id: i for i, doc_id in enumerate(docs["doc_id"])}
+        self._doc_cols = {col: docs[col].to_numpy(dtype=object) for col in DOC_COLUMNS}
+
+    def __len__(self) -> int:
+        return int(self._present.sum())
+
+    def _valid_vector_ids(self, vector_ids: List[int]) -> np.ndarray:
+        ids = np.asarray(vector_ids, dtype=np.int64)
+        ids = ids[(ids >= 0) & (ids < len(self._present))]
+        return ids[self._present[ids]]
+
+    def fetch_by_vector_ids(self, vector_ids: List[int]):
+        if not len(vector_ids):
+            return []
+
+        ids = self._valid_vector_ids(vector_ids)
+
+        return [
+            ChunkRow(int(vid), chunk_id, doc_id)
+            for vid, chunk_id, doc_id in zip(ids, self._chunk_id[ids], self._doc_id[ids])
+        ]
+
+    def fetch_by_doc_ids(self, doc_ids: List[str]):
+        if not doc_ids:
+            return []
+
+        positions = [self._doc_pos[d] for d in doc_ids if d in self._doc_pos]
+        columns = [self._doc_cols[col][positions] for col in DOC_COLUMNS]
+
+        return [DocRow(*values) for values in zip(*columns)]
+
+    def fetch_joined_by_vector_ids(self, vector_ids: List[int]):
+        if not len(vector_ids):
+            return []
+
+        rows = []
+        for vid in self._valid_vector_ids(vector_ids):
+            doc_id = self._doc_id[vid]
+            pos = self._doc_pos.get(doc_id)
+            if pos is None:
+                continue
+
+            rows.append(JoinedRow(
+                int(vid),
+                self._chunk_id[vid],
+                doc_id,
+                *(self._doc_cols[col][pos] for col in DOC_COLUMNS[1:]),
+            ))
+
+        return rows
+
+    def fetch_filter_columns(self):
+        rows = []
+        sections = self._doc_cols["section"]
+        titles = self._doc_cols["title"]
+
+        for vid in np.flatnonzero(self._present):
+            pos = self._doc_pos.get(self._doc_id[vid])
+            if pos is not None:
+                rows.append(FilterRow(int(vid), sections[pos], titles[pos]))
+
+        return rows
@@ -3,6 +3,24 @@ from src.db.session import get_engine
 import pandas as pd
 from typing import List
 
+JOINED_STATEMENT = "chunk_meta_by_vector_ids"
+
+JOINED_PREPARE_SQL = f"""
+    PREPARE {JOINED_STATEMENT} (integer[]) AS
+    SELECT
+        c.vector_id,
+        c.chunk_id,
+        c.doc_id,
+        m.title,
+        m.source,
+        m.section,
+        m.start_char,
+        m.end_char,
+        m.text
+    FROM chunks c
+    JOIN meta m ON m.doc_id = c.doc_id
+    WHERE c.vector_id = ANY($1)
+"""
 
 class MetadataStore:
 
@@ -19,6 +37,12 @@ class MetadataStore:
                     doc_id TEXT NOT NULL
                 );
             """))
+            # Covering index so the vector_id probe of the joined fetch
+            # is answered from the index without touching the heap
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS chunks_vector_id_covering_idx
+                ON chunks (vector_id) INCLUDE (chunk_id, doc_id);
+            """))
 
     def insert_from_dataframe(self, df: pd.DataFrame) -> None:
 
@@ -75,8 +99,40 @@ class MetadataStore:
                         doc_id
                     FROM chunks
                     WHERE vector_id = ANY(:vector_ids)
-                    ORDER BY vector_id
                 """),
                 {"vector_ids": vector_ids},
             )
             return result.fetchall()
+
+    def fetch_joined_by_vector_ids(self, vector_ids: List[int]):
+        """
+        chunks JOIN meta in a single round-trip, through a statement
+        prepared once per pooled connection.
+        """
+        if not vector_ids:
+            return []
+
+        with self.engine.connect() as conn:
+            # Connection.info lives as long as the underlying DBAPI connection
+            if not conn.info.get(JOINED_STATEMENT):
+                conn.exec_driver_sql(JOINED_PREPARE_SQL)
+                conn.info[JOINED_STATEMENT] = True
+
+            result = conn.execute(
+                text(f"EXECUTE {JOINED_STATEMENT}(:vector_ids)"),
+                {"vector_ids": [int(v) for v in vector_ids]},
+            )
+            return result.fetchall()
+
+    def fetch_filter_columns(self):
+        """(vector_id, section, title) for every chunk, used to build search filters."""
+        with self.engine.begin() as conn:
+            result = conn.execute(text("""
+                SELECT
+                    c.vector_id,
+                    m.section,
+                    m.title
+                FROM chunks c
+                JOIN meta m ON m.doc_id = c.doc_id
+            """))
+            return result.fetchall()
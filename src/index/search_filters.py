@@ -0,0 +1,98 @@
+import threading
+from collections import Counter, OrderedDict
+
+import faiss
+import numpy as np
+
+
+def normalize_title(title: str | None) -> str:
+    return (title or "").strip().lower()
+
+
+class SearchFilters:
+    """
+    Per-vector section / title columns turned into FAISS ID selectors, so
+    intent and title filters are applied inside the search rather than by
+    over-fetching and discarding hits afterwards.
+    """
+
+    def __init__(self, rows, ntotal: int, section_filters: dict, max_selectors: int = 256):
+        self.ntotal = ntotal
+        self.section_filters = section_filters
+        self.max_selectors = max_selectors
+
+        self.sections = np.full(ntotal, "", dtype=object)
+        self.titles = np.full(ntotal, "", dtype=object)
+        self.known = np.zeros(ntotal, dtype=bool)
+
+        for row in rows:
+            if 0 <= row.vector_id < ntotal:
+                self.sections[row.vector_id] = (row.section or "").lower()
+                self.titles[row.vector_id] = normalize_title(row.title)
+                self.known[row.vector_id] = True
+
+        self._title_masks = {}
+        for title in set(self.titles[self.known]):
+            self._title_masks[title] = self.titles == title
+
+        self._section_masks = {}
+        # (intent, title) -> selector, least recently used first
+        self._selectors = OrderedDict()
+        self._selectors_lock = threading.Lock()
+
+    def section_mask(self, query_type: str) -> np.ndarray | None:
+        allowed = self.section_filters.get(query_type)
+        if allowed is None:
+            return None
+
+        if query_type not in self._section_masks:
+            # match each distinct section name once, then broadcast
+            names, inverse = np.unique(self.sections.astype(str), return_inverse=True)
+            name_ok = np.array([any(s in name for s in allowed) for name in names], dtype=bool)
+            self._section_masks[query_type] = name_ok[inverse] & self.known
+        return self._section_masks[query_type]
+
+    def title_mask(self, title: str | None) -> np.ndarray | None:
+        if not title:
+            return None
+        return self._title_masks.get(normalize_title(title))
+
+    def mask(self, query_type: str, title: str | None = None) -> np.ndarray | None:
+        section = self.section_mask(query_type)
+        title_mask = self.title_mask(title)
+
+        if section is None:
+            return title_mask
+        if title_mask is None:
+            return section
+        return section & title_mask
+
+    def selector(self, query_type: str, title: str | None = None):
+        key = (query_type, normalize_title(title) or None)
+        with self._selectors_lock:
+            if key in self._selectors:
+                self._selectors.move_to_end(key)
+                return self._selectors[key]
+
+        mask = self.mask(query_type, title)
+        selector = None
+        if mask is not None:
+            # IDSelectorBitmap takes the bitmap's length in bytes and tests
+            # bit (id & 7) of byte (id >> 3)
+            bitmap = np.packbits(mask, bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+            # the selector only holds a raw pointer: keep the array alive with it,
+            # so an evicted selector still in use by a search stays valid
+            selector.bitmap_array = bitmap
+
+        with self._selectors_lock:
+            self._selectors[key] = selector
+            while len(self._selectors) > self.max_selectors:
+                self._selectors.popitem(last=False)
+        return selector
+
+    def majority_title(self, vector_ids) -> str | None:
+        titles = [self.titles[v] for v in vector_ids if 0 <= v < self.ntotal and self.titles[v]]
+        if not titles:
+            return None
+        return Counter(titles).most_common(1)[0][0]
@@ -0,0 +1,241 @@
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ..config import get_section, resolve_path
+from .search_filters import normalize_title
+
+DEFAULT_CATALOG_PATHS = ("data/catalog.csv", "data/movie_catalog/final_catalog.csv")
+
+# lexical candidates verified span-by-span; the rest are dropped
+MAX_CANDIDATES = 8
+# share of the final score taken by title-vs-query embedding similarity
+SEMANTIC_WEIGHT = 0.15
+YEAR_BONUS = 0.05
+# one-word titles this short ("Up", "Her") double as everyday words and
+# only match when they appear with the catalog's casing
+SHORT_TITLE_CHARS = 4
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def _match_text(text: str) -> str:
+    text = re.sub(r"[^a-z0-9]+", " ", (text or "").lower())
+    return text.strip()
+
+
+def _trigrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _dice(a: set, b: set) -> float:
+    return 2.0 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+class TitleResolver:
+    """
+    Fuzzy film-title lookup over the catalog.
+      1. char-trigram inverted index (CSR): one bincount gives, per title,
+         the share of its trigrams present in the query
+      2. the few titles that pass are verified against every query word
+         span of about their length (trigram Dice), so "The Dark Knight"
+         has to match as a phrase, not just as scattered words; ties go
+         to the longer title ("Iron Man 2" over "Iron Man")
+      3. when title embeddings and a query embedding are available they
+         nudge the score, which separates near-identical titles
+    film_id is the normalized title key used by the metadata and film shards.
+    """
+
+    def __init__(self, titles, years=None):
+        years = list(years) if years is not None else [None] * len(titles)
+
+        self.titles, self.film_ids, self.years = [], [], []
+        seen = {}
+        for title, year in zip(titles, years):
+            film_id = normalize_title(title)
+            if not film_id:
+                continue
+            if film_id in seen:
+                # keep the first spelling but fill a missing year from later catalogs
+                if year and not self.years[seen[film_id]]:
+                    self.years[seen[film_id]] = year
+                continue
+            seen[film_id] = len(self.titles)
+            self.titles.append(str(title).strip())
+            self.film_ids.append(film_id)
+            self.years.append(year or None)
+
+        self._gram_sets = [_trigrams(_match_text(t)) for t in self.titles]
+        self._word_counts = [len(_match_text(t).split()) for t in self.titles]
+        self._gram_counts = np.array([len(g) for g in self._gram_sets], dtype=np.float32)
+
+        vocab = {}
+        postings = {}
+        for i, grams in enumerate(self._gram_sets):
+            for g in grams:
+                gid = vocab.setdefault(g, len(vocab))
+                postings.setdefault(gid, []).append(i)
+
+        self._vocab = vocab
+        self._indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        for gid, ids in postings.items():
+            self._indptr[gid + 1] = len(ids)
+        np.cumsum(self._indptr, out=self._indptr)
+        self._postings = np.empty(self._indptr[-1], dtype=np.int32)
+        for gid, ids in postings.items():
+            self._postings[self._indptr[gid]:self._indptr[gid + 1]] = ids
+
+        self.embeddings = None
+
+    @classmethod
+    def from_catalogs(cls, paths=DEFAULT_CATALOG_PATHS) -> "TitleResolver":
+        titles, years = [], []
+        for path in paths:
+            path = resolve_path(path)
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path)
+            column = "title" if "title" in df.columns else "movie_title"
+            titles.extend(df[column].astype(str).tolist())
+            if "title_year" in df.columns:
+                years.extend(
+                    None if pd.isna(y) else str(int(y)) for y in df["title_year"]
+                )
+            else:
+                years.extend([None] * len(df))
+        return cls(titles, years)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def attach_embeddings(self, embeddings: np.ndarray) -> None:
+        if embeddings is not None and len(embeddings) == len(self.titles):
+            self.embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    def _candidates(self, text: str, min_score: float) -> np.ndarray:
+        gids = [self._vocab[g] for g in _trigrams(text) if g in self._vocab]
+        if not gids:
+            return np.empty(0, dtype=np.int64)
+
+        hits = np.concatenate(
+            [self._postings[self._indptr[g]:self._indptr[g + 1]] for g in gids]
+        )
+        containment = np.bincount(hits, minlength=len(self.titles)) / self._gram_counts
+
+        candidates = np.flatnonzero(containment >= min_score)
+        order = np.argsort(-containment[candidates], kind="stable")
+        return candidates[order][:MAX_CANDIDATES]
+
+    def _phrase_score(self, words: list[str], title_idx: int) -> float:
+        grams = self._gram_sets[title_idx]
+        size = self._word_counts[title_idx]
+        best = 0.0
+        for n in (size - 1, size, size + 1):
+            if n < 1:
+                continue
+            for i in range(len(words) - n + 1):
+                best = max(best, _dice(grams, _trigrams(" ".join(words[i:i + n]))))
+        return best
+
+    def _casing_ok(self, query: str, title_idx: int) -> bool:
+        title = self.titles[title_idx]
+        if self._word_counts[title_idx] > 1 or len(title) > SHORT_TITLE_CHARS:
+            return True
+        return re.search(rf"\b{re.escape(title)}\b", query) is not None
+
+    def resolve(
+        self,
+        query: str,
+        query_embedding: np.ndarray | None = None,
+        top_n: int = 3,
+        min_score: float = 0.8,
+    ) -> list[dict]:
+        """Best-matching catalog titles, highest score first."""
+        text = _match_text(query)
+        if not text or not self.titles:
+            return []
+
+        words = text.split()
+        query_years = set(re.findall(r"\b(?:19|20)\d{2}\b", text))
+
+        results = []
+        for t in self._candidates(text, min_score):
+            score = self._phrase_score(words, t)
+            if score < min_score or not self._casing_ok(query, t):
+                continue
+            if self.embeddings is not None and query_embedding is not None:
+                semantic = float(self.embeddings[t] @ query_embedding)
+                score = (1 - SEMANTIC_WEIGHT) * score + SEMANTIC_WEIGHT * semantic
+            if self.years[t] and self.years[t] in query_years:
+                score += YEAR_BONUS
+            results.append((round(score, 4), self._gram_counts[t], t))
+
+        results.sort(reverse=True)
+        return [
+            {
+                "film_id": self.film_ids[t],
+                "title": self.titles[t],
+                "year": self.years[t],
+                "score": score,
+            }
+            for score, _, t in results[:top_n]
+        ]
+
+
+def _title_embeddings(titles: list[str], path) -> np.ndarray | None:
+    """Encode the catalog titles once and cache them next to the chunk embeddings."""
+    if os.path.exists(path):
+        cached = np.load(path)
+        try:
+            if cached["titles"].tolist() == titles:
+                return cached["embeddings"]
+        except ValueError:
+            pass  # written by an older build as a pickled object array; re-encode
+
+    try:
+        from ..embedding.embedding_model import get_embedding_model
+        embeddings = get_embedding_model().encode(
+            titles,
+            batch_size=64,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+    except Exception as e:
+        print(f"Title embeddings unavailable, resolving lexically only: {e}")
+        return None
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, titles=np.array(titles, dtype=str), embeddings=embeddings)
+    return embeddings
+
+
+def get_title_resolver() -> TitleResolver:
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                cfg = get_section("title_resolver")
+                resolver = TitleResolver.from_catalogs(
+                    cfg.get("catalog_paths", DEFAULT_CATALOG_PATHS)
+                )
+                if cfg.get("embeddings_path"):
+                    resolver.attach_embeddings(
+                        _title_embeddings(resolver.titles, resolve_path(cfg["embeddings_path"]))
+                    )
+                _resolver = resolver
+    return _resolver
+
+
+def resolve_title(query: str, query_embedding: np.ndarray | None = None) -> dict | None:
+    """Single best catalog match above `title_resolver.min_score`, or None."""
+    min_score = get_section("title_resolver").get("min_score", 0.8)
+    matches = get_title_resolver().resolve(
+        query, query_embedding=query_embedding, top_n=1, min_score=min_score
+    )
+    return matches[0] if matches else None
@@ -0,0 +1,137 @@
+import json
+import math
+import os
+import random
+import threading
+import time
+
+from ..config import get_section, resolve_path
+from ..index.search_filters import normalize_title
+
+FEATURES = (
+    "top_score",
+    "margin",
+    "mean_top3",
+    "title_agreement",
+    "film_resolved",
+    "n_candidates",
+)
+
+# the LLM's "I don't know" replies; the one definition shared by the API, evaluation and calibration
+ABSTENTION_ANSWERS = {
+    "i don't know.",
+    "i don't know based on the given context.",
+    "not enough information in the context.",
+}
+
+_gate = None
+_gate_loaded = False
+_gate_lock = threading.Lock()
+_log_lock = threading.Lock()
+
+
+def is_abstention(answer: str) -> bool:
+    return answer.strip().lower() in ABSTENTION_ANSWERS
+
+
+def gate_features(reranked: list[dict]) -> dict:
+    """Retrieval-evidence features of a reranked candidate list (best first)."""
+    scores = [c.get("rerank_score", 0.0) for c in reranked]
+    top = scores[0] if scores else 0.0
+
+    title_mass = {}
+    for c, score in zip(reranked, scores):
+        title = normalize_title(c.get("title"))
+        if title:
+            title_mass[title] = title_mass.get(title, 0.0) + max(score, 0.0)
+    total_mass = sum(title_mass.values())
+
+    extracted = normalize_title(reranked[0].get("extracted_movie")) if reranked else ""
+    top_title = normalize_title(reranked[0].get("title")) if reranked else ""
+
+    return {
+        "top_score": float(top),
+        "margin": float(top - scores[1]) if len(scores) > 1 else float(top),
+        "mean_top3": float(sum(scores[:3]) / len(scores[:3])) if scores else 0.0,
+        # share of the score mass on the best-supported film
+        "title_agreement": float(max(title_mass.values()) / total_mass) if total_mass else 0.0,
+        # the query named a film and the top chunk belongs to it
+        "film_resolved": float(bool(extracted) and extracted == top_title),
+        "n_candidates": float(len(scores)),
+    }
+
+
+class AbstentionGate:
+    """
+    Logistic model over `gate_features`, fit offline by
+    src/eval/calibrate_abstention.py. Predicts whether the LLM would
+    answer "I don't know" from this evidence; at or above `threshold`
+    the request abstains without calling it.
+    """
+
+    def __init__(self, coef: dict, intercept: float, threshold: float):
+        self.coef = coef
+        self.intercept = intercept
+        self.threshold = threshold
+
+    @classmethod
+    def load(cls, path: str) -> "AbstentionGate | None":
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["coef"], data["intercept"], data["threshold"])
+
+    def probability(self, features: dict) -> float:
+        z = self.intercept + sum(w * features.get(name, 0.0) for name, w in self.coef.items())
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def should_abstain(self, features: dict) -> bool:
+        return self.probability(features) >= self.threshold
+
+
+def get_abstention_gate() -> AbstentionGate | None:
+    """The calibrated gate, or None when disabled or not yet calibrated."""
+    global _gate, _gate_loaded
+    cfg = get_section("abstention")
+    if not cfg.get("enabled", True):
+        return None
+
+    if not _gate_loaded:
+        with _gate_lock:
+            if not _gate_loaded:
+                _gate = AbstentionGate.load(
+                    str(resolve_path(cfg.get("model_path", "data/abstention_gate.json")))
+                )
+                _gate_loaded = True
+    return _gate
+
+
+def log_features(query_type: str, features: dict, answer: str) -> None:
+    """
+    Append a sample of LLM-answered requests to the calibration log. Only
+    the retrieval features and whether the LLM abstained are kept, never
+    the user's query or the answer text. Past `log_max_mb` the file is
+    rotated to `<log_path>.1`, so at most twice that stays on disk.
+    """
+    cfg = get_section("abstention")
+    if not cfg.get("log_features", False):
+        return
+    if random.random() >= cfg.get("log_sample_rate", 0.1):
+        return
+
+    path = str(resolve_path(cfg.get("log_path", "data/logs/abstention_features.jsonl")))
+    max_bytes = int(cfg.get("log_max_mb", 16) * 1024 * 1024)
+    record = {
+        "ts": time.time(),
+        "query_type": query_type,
+        "features": features,
+        "abstained": is_abstention(answer),
+    }
+
+    with _log_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+            os.replace(path, path + ".1")
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
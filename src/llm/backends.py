@@ -0,0 +1,375 @@
+import asyncio
+import math
+from abc import ABC, abstractmethod
+import random
+import re
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SYSTEM_PROMPT = "You are a precise, context-grounded assistant."
+
+NO_CONTEXT_ANSWER = "I don't know based on the given context."
+
+
+def _messages(prompt: str) -> list[dict]:
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        },
+    ]
+
+
+class LLMBackend(ABC):
+    """One prompt in, the completion text (or its deltas) out."""
+
+    name = "base"
+
+    @abstractmethod
+    def generate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2) -> str:
+        ...
+
+    @abstractmethod
+    async def agenerate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2) -> str:
+        ...
+
+    @abstractmethod
+    def astream(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2):
+        """Async iterator over the completion's text deltas."""
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class GroqBackend(LLMBackend):
+    """
+    Groq chat completions. The async path shares one pooled keep-alive HTTP
+    client, caps in-flight calls with a semaphore, retries 429 / 5xx /
+    connection errors with full-jitter exponential backoff (honouring
+    Retry-After), and can hedge: if a call hasn't answered by the recent
+    p95 latency a second one is sent and the first to finish wins.
+    """
+
+    name = "groq"
+
+    def __init__(
+        self,
+        model: str = "llama-3.3-70b-versatile",
+        max_connections: int = 32,
+        max_keepalive: int = 16,
+        keepalive_expiry_s: float = 30.0,
+        connect_timeout_s: float = 3.0,
+        read_timeout_s: float = 15.0,
+        max_concurrency: int = 16,
+        retries: int = 3,
+        backoff_base_ms: float = 200,
+        backoff_max_ms: float = 4000,
+        hedge: bool = False,
+        hedge_min_ms: float = 1500,
+        latency_window: int = 256,
+    ):
+        self.model = model
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry_s = keepalive_expiry_s
+        self.connect_timeout_s = connect_timeout_s
+        self.read_timeout_s = read_timeout_s
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_base_ms = backoff_base_ms
+        self.backoff_max_ms = backoff_max_ms
+        self.hedge = hedge
+        self.hedge_min_ms = hedge_min_ms
+
+        self._client = None
+        self._async_client = None
+        self._semaphore = None
+        self._rng = random.Random()
+        self._latencies = deque(maxlen=latency_window)
+
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def _limits_and_timeout(self):
+        import httpx
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry_s,
+        )
+        timeout = httpx.Timeout(self.read_timeout_s, connect=self.connect_timeout_s)
+        return limits, timeout
+
+    def _sync(self):
+        if self._client is None:
+            import httpx
+            from groq import Groq
+            limits, timeout = self._limits_and_timeout()
+            self._client = Groq(
+                http_client=httpx.Client(limits=limits, timeout=timeout),
+                max_retries=self.retries,
+            )
+        return self._client
+
+    def _async(self):
+        if self._async_client is None:
+            import httpx
+            from groq import AsyncGroq
+            limits, timeout = self._limits_and_timeout()
+            # retries are handled in _with_retries so they respect the semaphore and hedging
+            self._async_client = AsyncGroq(
+                http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+                max_retries=0,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    def _retry_delay_s(self, error, attempt: int) -> float | None:
+        """Seconds to wait before retrying, or None when the error isn't retryable."""
+        import groq
+
+        if isinstance(error, groq.APIStatusError):
+            if error.status_code != 429 and error.status_code < 500:
+                return None
+            retry_after = error.response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max_ms / 1000)
+                except ValueError:
+                    pass
+        elif not isinstance(error, groq.APIConnectionError):
+            return None
+
+        cap = min(self.backoff_max_ms, self.backoff_base_ms * 2 ** attempt) / 1000
+        return self._rng.uniform(0, cap)
+
+    async def _with_retries(self, make_call, completion: bool = True):
+        """
+        Run `make_call` under the concurrency cap, retrying transient errors.
+        Only full completions (`completion`) feed the hedging latency window;
+        a stream's caller holds the semaphore itself for the whole stream.
+        """
+        client = self._async()
+        attempt = 0
+        while True:
+            try:
+                if completion:
+                    async with self._semaphore:
+                        start = time.perf_counter()
+                        result = await make_call(client)
+                    self._latencies.append(time.perf_counter() - start)
+                else:
+                    result = await make_call(client)
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                delay = self._retry_delay_s(e, attempt)
+                if delay is None or attempt >= self.retries:
+                    self.failed += 1
+                    raise
+                attempt += 1
+                self.retried += 1
+                await asyncio.sleep(delay)
+
+    def hedge_delay_s(self) -> float:
+        """Recent p95 call latency, floored at hedge_min_ms."""
+        floor = self.hedge_min_ms / 1000
+        if len(self._latencies) < 20:
+            return floor
+        latencies = sorted(self._latencies)
+        return max(floor, latencies[int(0.95 * (len(latencies) - 1))])
+
+    async def _hedged(self, make_call):
+        primary = asyncio.ensure_future(self._with_retries(make_call))
+        backup = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay_s())
+            if done:
+                return primary.result()
+
+            self.hedges_sent += 1
+            backup = asyncio.ensure_future(self._with_retries(make_call))
+            pending = {primary, backup}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.hedges_won += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary, backup):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    def generate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2) -> str:
+        response = self._sync().chat.completions.create(
+            model=self.model,
+            messages=_messages(prompt),
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        return response.choices[0].message.content.strip()
+
+    async def agenerate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2) -> str:
+        self.calls += 1
+
+        def make_call(client):
+            return client.chat.completions.create(
+                model=self.model,
+                messages=_messages(prompt),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+
+        if self.hedge:
+            response = await self._hedged(make_call)
+        else:
+            response = await self._with_retries(make_call)
+        return response.choices[0].message.content.strip()
+
+    async def astream(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2):
+        # opening the stream is retried; once tokens flow it can't be replayed or hedged.
+        # The slot is held until the last token, so max_concurrency caps open streams too.
+        self.calls += 1
+        self._async()
+        async with self._semaphore:
+            stream = await self._with_retries(
+                lambda client: client.chat.completions.create(
+                    model=self.model,
+                    messages=_messages(prompt),
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,
+                ),
+                completion=False,
+            )
+
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "model": self.model,
+            "calls": self.calls,
+            "retried": self.retried,
+            "failed": self.failed,
+            "hedges_sent": self.hedges_sent,
+            "hedges_won": self.hedges_won,
+            "hedge_delay_ms": round(self.hedge_delay_s() * 1000, 1),
+        }
+
+
+class LocalBackend(LLMBackend):
+    """
+    Offline stand-in for load tests and perf regressions. Answers with the
+    first sentence of the first context passage (so the support filter and
+    citations see a grounded answer) after a simulated delay: log-normal
+    time to first token around `latency_ms`, then `tokens_per_s`.
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        latency_sigma: float = 0.35,
+        tokens_per_s: float = 250,
+        template: str = "{passage}",
+        seed: int | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_s = tokens_per_s
+        self.template = template
+        self._rng = random.Random(seed)
+
+    def _answer(self, prompt: str, max_tokens: int) -> list[str]:
+        passage = NO_CONTEXT_ANSWER
+        context = re.search(r"Context:\n\[\d+\][^\n]*\n(.+?)(?:\n\n|$)", prompt, re.S)
+        if context:
+            sentence = re.match(r"\s*(.+?[.!?])(?:\s|$)", context.group(1), re.S)
+            passage = (sentence.group(1) if sentence else context.group(1)).strip()
+
+        movie = re.search(r"movie:\n([^\n]*)", prompt)
+        text = self.template.format(passage=passage, movie=movie.group(1) if movie else "")
+
+        # whitespace-led words, so the deltas concatenate back to the text
+        return re.findall(r"\s*\S+", text)[:max_tokens]
+
+    def _first_token_s(self) -> float:
+        median = self.latency_ms / 1000
+        return self._rng.lognormvariate(math.log(median), self.latency_sigma) if median > 0 else 0.0
+
+    def _token_s(self) -> float:
+        return 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+    def generate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2) -> str:
+        tokens = self._answer(prompt, max_tokens)
+        time.sleep(self._first_token_s() + len(tokens) * self._token_s())
+        return "".join(tokens).strip()
+
+    async def agenerate(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2) -> str:
+        tokens = self._answer(prompt, max_tokens)
+        await asyncio.sleep(self._first_token_s() + len(tokens) * self._token_s())
+        return "".join(tokens).strip()
+
+    async def astream(self, prompt: str, max_tokens: int = 256, temperature: float = 0.2):
+        tokens = self._answer(prompt, max_tokens)
+        await asyncio.sleep(self._first_token_s())
+        for token in tokens:
+            yield token
+            await asyncio.sleep(self._token_s())
+
+
+def create_backend(cfg: dict) -> LLMBackend:
+    backend = cfg.get("backend", "groq")
+
+    if backend == "groq":
+        http = cfg.get("http") or {}
+        return GroqBackend(
+            model=cfg.get("model", "llama-3.3-70b-versatile"),
+            max_connections=http.get("max_connections", 32),
+            max_keepalive=http.get("max_keepalive", 16),
+            keepalive_expiry_s=http.get("keepalive_expiry_s", 30.0),
+            connect_timeout_s=http.get("connect_timeout_s", 3.0),
+            read_timeout_s=http.get("read_timeout_s", 15.0),
+            max_concurrency=cfg.get("max_concurrency", 16),
+            retries=cfg.get("retries", 3),
+            backoff_base_ms=cfg.get("backoff_base_ms", 200),
+            backoff_max_ms=cfg.get("backoff_max_ms", 4000),
+            hedge=cfg.get("hedge", False),
+            hedge_min_ms=cfg.get("hedge_min_ms", 1500),
+        )
+
+    if backend == "local":
+        local = cfg.get("local") or {}
+        return LocalBackend(
+            latency_ms=local.get("latency_ms", 800),
+            latency_sigma=local.get("latency_sigma", 0.35),
+            tokens_per_s=local.get("tokens_per_s", 250),
+            template=local.get("template", "{passage}"),
+            seed=local.get("seed"),
+        )
+
+    raise ValueError(f"Unknown llm backend: {backend!r} (expected 'groq' or 'local')")
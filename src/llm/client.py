@@ -1,43 +1,63 @@
-from dotenv import load_dotenv
-from groq import Groq
+import threading
+import time
 
-load_dotenv() 
+from src.config import get_section
+from src.metrics import in_flight, observe_stage, timed
+from .backends import LLMBackend, create_backend
 
-_MODEL_NAME = "llama-3.3-70b-versatile"
+_backend = None
+_backend_lock = threading.Lock()
 
 
-_client = None
+def get_backend() -> LLMBackend:
+    """The LLM backend named by `llm.backend` in config.yaml (groq | local)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(get_section("llm"))
+    return _backend
 
 
-def get_llm():
-    global _client
-    if _client is None:
-        _client = Groq()  
-    return _client
+def generate_answer(
+    prompt: str,
+    max_tokens: int = 256,
+    temperature: float = 0.2,
+) -> str:
+    with in_flight("llm"), timed("llm_total"):
+        return get_backend().generate(prompt, max_tokens=max_tokens, temperature=temperature)
 
 
-def generate_answer(
+async def agenerate_answer(
     prompt: str,
     max_tokens: int = 256,
     temperature: float = 0.2,
 ) -> str:
+    with in_flight("llm"), timed("llm_total"):
+        return await get_backend().agenerate(prompt, max_tokens=max_tokens, temperature=temperature)
 
-    client = get_llm()
-
-    response = client.chat.completions.create(
-        model=_MODEL_NAME,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a precise, context-grounded assistant."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            },
-        ],
-        temperature=temperature,
-        max_tokens=max_tokens,
+
+def astream_answer(
+    prompt: str,
+    max_tokens: int = 256,
+    temperature: float = 0.2,
+):
+    """Async generator of completion text deltas as the model produces them."""
+    return _timed_stream(
+        get_backend().astream(prompt, max_tokens=max_tokens, temperature=temperature)
     )
 
-    return response.choices[0].message.content.strip()
+
+async def _timed_stream(deltas):
+    start = time.perf_counter()
+    first = True
+    with in_flight("llm"):
+        try:
+            async for delta in deltas:
+                if first:
+                    observe_stage("llm_first_token", time.perf_counter() - start)
+                    first = False
+                yield delta
+        finally:
+            await deltas.aclose()
+            observe_stage("llm_total", time.perf_counter() - start)
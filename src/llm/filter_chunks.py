@@ -1,14 +1,7 @@
 import numpy as np
 from typing import List, Dict
-from src.embedding.embedding_model import load_embedding_model
-
-_model = None
-
-def _get_model():
-    global _model
-    if _model is None:
-        _model = load_embedding_model()
-    return _model
+from src.embedding.embedding_model import encode_query
+from src.retrieval.rerank import chunk_embeddings
 
 
 def _tokenize_answer(answer: str) -> List[str]:
@@ -21,10 +14,6 @@ def _hard_filter(answer: str, chunk_text: str) -> bool:
     return any(tok in text for tok in tokens)
 
 
-def _cosine(a: np.ndarray, b: np.ndarray) -> float:
-    return float(np.dot(a, b))
-
-
 def filter_supported_chunks(
     answer: str,
     chunks: List[Dict],
@@ -36,26 +25,15 @@ def filter_supported_chunks(
     if not answer or not chunks:
         return []
 
-    model = _get_model()
-
-    answer_emb = model.encode(
-        answer,
-        normalize_embeddings=True,
-        show_progress_bar=False,
-    )
-    answer_emb = np.asarray(answer_emb, dtype="float32")
+    answer_emb = encode_query(answer)
 
-    texts = [c["text"] for c in chunks]
-    chunk_embs = model.encode(
-        texts,
-        normalize_embeddings=True,
-        show_progress_bar=False,
-    )
-    chunk_embs = np.asarray(chunk_embs, dtype="float32")
+    # Chunk vectors come from retrieval (carried on the dict or looked up
+    # by vector_id), so only the answer goes through the encoder here.
+    sims = chunk_embeddings(chunks) @ answer_emb
 
     supported = []
 
-    for chunk, emb in zip(chunks, chunk_embs):
+    for chunk, sim in zip(chunks, sims):
 
         if query_type in {"fact", "director"}:
             hard_pass = True
@@ -65,7 +43,6 @@ def filter_supported_chunks(
         if not hard_pass:
             continue
 
-        sim = _cosine(answer_emb, emb)
         if sim < sim_threshold:
             continue
 
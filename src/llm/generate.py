@@ -1,10 +1,17 @@
-from .client import generate_answer as groq_generate
-from .prompt_temp import build_prompt
+from .client import generate_answer as llm_generate
+from .client import agenerate_answer as llm_agenerate
+from .prompt_temp import build_prompt, pack_chunks, INTENT_INSTRUCTIONS
 from .safety import postprocess_answer
 
 from ..retrieval.retrieve import retrieve_by_text
-from ..retrieval.rerank import rerank
+from ..index.index_utils import index_version
+from ..retrieval.rerank import rerank, cross_encoder_rerank
 from .filter_chunks import filter_supported_chunks
+from .abstention import gate_features, get_abstention_gate, log_features
+from ..serving.executor import run_cpu
+from ..serving.prompt_cache import get_prompt_cache, prompt_cache_key
+from ..metrics import EARLY_ANSWERS, timed
+from ..config import get_section
 
 
 QUESTION_TOP_K = {
@@ -24,18 +31,25 @@ def adaptive_top_k(
     base_k: int,
     max_k: int = 8,
     score_drop_threshold: float = 0.25,
+    score_key: str = "rerank_score",
 ):
+    """
+    Take `base_k` chunks, then more while they stay within
+    `score_drop_threshold` of the best. `score_key` is the score the list
+    is sorted by ("ce_score" after the cross-encoder); chunks without it
+    were never scored and end the list.
+    """
     if len(reranked_chunks) <= base_k:
         return reranked_chunks
 
     selected = reranked_chunks[:base_k]
-    top_score = selected[0]["rerank_score"]
+    top_score = selected[0][score_key]
 
     for chunk in reranked_chunks[base_k:]:
         if len(selected) >= max_k:
             break
 
-        if top_score - chunk["rerank_score"] <= score_drop_threshold:
+        if score_key in chunk and top_score - chunk[score_key] <= score_drop_threshold:
             selected.append(chunk)
         else:
             break
@@ -50,28 +64,67 @@ def choose_top_k(reranked_chunks: list[dict]) -> list[dict]:
     q_type = reranked_chunks[0].get("query_type", "general")
     base_k = QUESTION_TOP_K.get(q_type, QUESTION_TOP_K["general"])
 
+    # after the cross-encoder the list is in ce_score order, on a logit scale
+    if "ce_score" in reranked_chunks[0]:
+        return adaptive_top_k(
+            reranked_chunks=reranked_chunks,
+            base_k=base_k,
+            score_drop_threshold=get_section("rerank").get("ce_drop_threshold", 3.0),
+            score_key="ce_score",
+        )
+
     return adaptive_top_k(
         reranked_chunks=reranked_chunks,
         base_k=base_k,
     )
 
 
-def generate_answer(
-    query: str,
-    max_tokens: int = 256,
-) -> dict:
+NO_CONTEXT_ANSWER = "I don't know based on the given context."
+AMBIGUOUS_ANSWER = "This movie title is ambiguous. Please specify the release year or full title."
+
+
+def _early_answer(answer: str) -> dict:
+    return {
+        "answer": answer,
+        "context": [],
+        "movie": "unknown",
+        "query_type": "general",
+    }
+
+
+def prepare_prompt(query: str) -> dict:
+    """
+    Everything before the LLM call: retrieve, rerank, pick chunks, build the prompt.
+    Returns a final answer dict (with "answer") when no LLM call is needed.
+    """
 
     retrieved = retrieve_by_text(query, k=15)
-    q_type = retrieved[0].get("query_type", "general")
-    reranked = rerank(query, retrieved, query_type=q_type, top_k=9)
+    q_type = retrieved[0].get("query_type", "general") if retrieved else "general"
+    rerank_cfg = get_section("rerank")
+    with timed("rerank"):
+        reranked = rerank(
+            query,
+            retrieved,
+            query_type=q_type,
+            top_k=9,
+            lexical_admit_rank=rerank_cfg.get("lexical_admit_rank", 3),
+        )
+
+    if rerank_cfg.get("cross_encoder", False):
+        with timed("cross_encoder"):
+            reranked = cross_encoder_rerank(
+                query,
+                reranked,
+                candidate_budget=rerank_cfg.get("candidate_budget", 6),
+                batch_size=rerank_cfg.get("batch_size", 4),
+                max_passage_chars=rerank_cfg.get("max_passage_chars", 1200),
+                decisive_margin=rerank_cfg.get("decisive_margin", 4.0),
+                min_ce_score=rerank_cfg.get("min_ce_score"),
+            )
 
     if not reranked:
-        return {
-            "answer": "I don't know based on the given context.",
-            "context": [],
-            "movie": "unknown",
-            "query_type": "general",
-        }
+        EARLY_ANSWERS.labels("no_context").inc()
+        return _early_answer(NO_CONTEXT_ANSWER)
 
     query_r = reranked[0].get("rewritten_query") or query
     movie = reranked[0].get("title", "unknown")
@@ -87,36 +140,68 @@ def generate_answer(
         movie_scores[title] = movie_scores.get(title, 0.0) + score
     unique_movies = list(movie_scores.keys())
     if len(unique_movies) > 7:
-        return {
-            "answer": "This movie title is ambiguous. Please specify the release year or full title.",
-            "context": [],
-            "movie": "unknown",
-            "query_type": "general",
-        }
-        
-    reranked = choose_top_k(reranked)
-
-    prompt = build_prompt(
-        query=query_r,
-        chunks=reranked,
-        query_intent=q_type,
-        movie=movie,
-    )
+        EARLY_ANSWERS.labels("ambiguous").inc()
+        return _early_answer(AMBIGUOUS_ANSWER)
 
-    answer = groq_generate(
-        prompt=prompt,
-        max_tokens=max_tokens,
-        temperature=0.2,
-    )
+    # evidence too weak for the LLM to do anything but abstain: skip the call
+    features = gate_features(reranked)
+    gate = get_abstention_gate()
+    if gate is not None and gate.should_abstain(features):
+        EARLY_ANSWERS.labels("abstention_gate").inc()
+        return _early_answer(NO_CONTEXT_ANSWER)
 
-    answer = postprocess_answer(answer)
+    with timed("prompt_build"):
+        reranked = pack_chunks(choose_top_k(reranked), q_type)
+
+        prompt = build_prompt(
+            query=query_r,
+            chunks=reranked,
+            query_intent=q_type,
+            movie=movie,
+        )
+
+    # a previous completion for the same instruction, chunks and question is reused
+    cache_key, cached_answer = None, None
+    prompt_cache = get_prompt_cache()
+    if prompt_cache is not None:
+        llm_cfg = get_section("llm")
+        cache_key = prompt_cache_key(
+            INTENT_INSTRUCTIONS.get(q_type, INTENT_INSTRUCTIONS["general"]),
+            [c.get("chunk_id") for c in reranked],
+            query,
+            model=f"{llm_cfg.get('backend', 'groq')}:{llm_cfg.get('model')}",
+            version=index_version(),
+        )
+        cached_answer = prompt_cache.get(cache_key)
+
+    return {
+        "prompt": prompt,
+        "reranked": reranked,
+        "movie": movie,
+        "query_type": q_type,
+        "cache_key": cache_key,
+        "cached_answer": cached_answer,
+        "query": query,
+        "gate_features": features,
+    }
 
-    final_context = filter_supported_chunks(
-        answer=answer,
-        chunks=reranked,
-        query_type=q_type,
-        sim_threshold=0.55
-    )
+
+def finalize_answer(raw_answer: str, prepared: dict) -> dict:
+    answer = postprocess_answer(raw_answer)
+    reranked = prepared["reranked"]
+
+    if prepared.get("cached_answer") is None:
+        if prepared.get("cache_key"):
+            get_prompt_cache().put(prepared["cache_key"], answer)
+        log_features(prepared["query_type"], prepared["gate_features"], answer)
+
+    with timed("support_filter"):
+        final_context = filter_supported_chunks(
+            answer=answer,
+            chunks=reranked,
+            query_type=prepared["query_type"],
+            sim_threshold=0.55
+        )
 
     if not final_context:
         final_context = []
@@ -125,6 +210,50 @@ def generate_answer(
         "answer": answer,
         "context": final_context,
         "context_raw": reranked,
-        "movie": movie,
-        "query_type": q_type,
+        "movie": prepared["movie"],
+        "query_type": prepared["query_type"],
     }
+
+
+def generate_answer(
+    query: str,
+    max_tokens: int = 256,
+) -> dict:
+
+    prepared = prepare_prompt(query)
+    if "answer" in prepared:
+        return prepared
+
+    answer = prepared["cached_answer"]
+    if answer is None:
+        answer = llm_generate(
+            prompt=prepared["prompt"],
+            max_tokens=max_tokens,
+            temperature=0.2,
+        )
+
+    return finalize_answer(answer, prepared)
+
+
+async def agenerate_answer(
+    query: str,
+    max_tokens: int = 256,
+) -> dict:
+    """
+    Async variant for the API: CPU stages run on the shared executor and the
+    LLM call is awaited, so cancelling this coroutine aborts the request.
+    """
+
+    prepared = await run_cpu(prepare_prompt, query)
+    if "answer" in prepared:
+        return prepared
+
+    answer = prepared["cached_answer"]
+    if answer is None:
+        answer = await llm_agenerate(
+            prompt=prepared["prompt"],
+            max_tokens=max_tokens,
+            temperature=0.2,
+        )
+
+    return await run_cpu(finalize_answer, answer, prepared)
@@ -1,3 +1,34 @@
+import math
+import re
+
+# Context tokens allowed per intent. A retrieved chunk is up to 800 chars
+# plus sentence overlap: ~150-200 word/punctuation pieces, ~190-250 LLM
+# tokens after BPE_CORRECTION. Budgets are sized as chunk counts at ~250
+# tokens each: 3 for short lookups, 5-6 for narrative intents.
+INTENT_TOKEN_BUDGETS = {
+    "fact": 750,
+    "director": 750,
+    "ending": 1250,
+    "plot": 1500,
+    "character": 1250,
+    "explanation": 1250,
+    "summary": 1500,
+    "general": 1250,
+}
+
+# the best chunks always go in, whatever the budget, so short lookups keep a corroborating passage
+MIN_PACKED_CHUNKS = 2
+
+# words and punctuation marks
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]")
+
+# The regex undercounts the LLM's BPE tokenizer, which splits names, numbers
+# and rare words into sub-words; on English film prose Llama-3 yields ~1.25
+# tokens per piece. The real tokenizer isn't available locally (the model is
+# served remotely), so counts are scaled by this factor instead.
+BPE_CORRECTION = 1.25
+
+
 INTENT_INSTRUCTIONS = {
 
     "fact": (
@@ -90,6 +121,97 @@ INTENT_INSTRUCTIONS = {
 
 
 
+def count_tokens(text: str) -> int:
+    """Estimated LLM tokens in `text`."""
+    return math.ceil(len(_TOKEN_PIECES.findall(text or "")) * BPE_CORRECTION)
+
+
+def _parent_doc(chunk: dict) -> str:
+    # section chunks of one document share the prefix: DOC_000001_C001, DOC_000001_C002, ...
+    return str(chunk.get("doc_id", "")).rsplit("_C", 1)[0]
+
+
+def _trim_overlap(chunk: dict, kept: list[dict]) -> dict | None:
+    """
+    Drop the part of `chunk` whose [start_char, end_char) span is already
+    covered by a kept chunk of the same parent document. Returns None when
+    nothing new is left.
+    """
+    start, end = chunk.get("start_char"), chunk.get("end_char")
+    if start is None or end is None:
+        return chunk
+
+    text = chunk["text"]
+    for other in kept:
+        if _parent_doc(other) != _parent_doc(chunk):
+            continue
+        o_start, o_end = other.get("start_char"), other.get("end_char")
+        if o_start is None or o_end is None or o_end <= start or o_start >= end:
+            continue
+
+        if o_start <= start and o_end >= end:
+            return None
+        if o_start <= start:
+            # kept chunk covers our head; offsets are approximate, so cut at a word boundary
+            cut = text.find(" ", o_end - start)
+            text = text[cut + 1:] if cut != -1 else ""
+            start = o_end
+        elif o_end >= end:
+            cut = text.rfind(" ", 0, o_start - start)
+            text = text[:cut] if cut != -1 else ""
+            end = o_start
+        # a kept chunk strictly inside ours is left alone
+
+    text = text.strip()
+    if not text:
+        return None
+    if text == chunk["text"]:
+        return chunk
+    return {**chunk, "text": text, "start_char": start, "end_char": end}
+
+
+def pack_chunks(chunks: list[dict], query_intent: str, budget: int | None = None) -> list[dict]:
+    """
+    Fit the selected chunks (best first) into the intent's context-token
+    budget. The first MIN_PACKED_CHUNKS always go in; the rest are taken
+    greedily by rerank_score per token. Spans a kept chunk of the same
+    document already covers are trimmed first. Returned in their original
+    order.
+    """
+    if not chunks:
+        return chunks
+
+    if budget is None:
+        budget = INTENT_TOKEN_BUDGETS.get(query_intent, INTENT_TOKEN_BUDGETS["general"])
+
+    kept = {0: chunks[0]}
+    used = count_tokens(chunks[0]["text"])
+
+    head = min(MIN_PACKED_CHUNKS, len(chunks))
+    for i in range(1, head):
+        chunk = _trim_overlap(chunks[i], list(kept.values()))
+        if chunk is not None:
+            kept[i] = chunk
+            used += count_tokens(chunk["text"])
+
+    by_density = sorted(
+        range(head, len(chunks)),
+        key=lambda i: chunks[i]["rerank_score"] / max(count_tokens(chunks[i]["text"]), 1),
+        reverse=True,
+    )
+    for i in by_density:
+        chunk = _trim_overlap(chunks[i], list(kept.values()))
+        if chunk is None:
+            continue
+        tokens = count_tokens(chunk["text"])
+        if used + tokens > budget:
+            continue
+        kept[i] = chunk
+        used += tokens
+
+    return [kept[i] for i in sorted(kept)]
+
+
 def build_prompt(
     query: str,
     chunks: list[dict],
@@ -104,11 +226,7 @@ def build_prompt(
 
     context_blocks = []
     for i, c in enumerate(chunks, start=1):
-        block = (
-            f"[Chunk {i} | score={c['rerank_score']:.3f} | "
-            f"source={c.get('source')} | movie: {c['title']} | section={c.get('section')}]\n"
-            f"{c['text']}"
-        )
+        block = f"[{i}] {c['title']} | {c.get('section')}\n{c['text']}"
         context_blocks.append(block)
 
     context = "\n\n".join(context_blocks)
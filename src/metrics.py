@@ -0,0 +1,103 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# sub-millisecond lookups up to multi-second LLM calls
+STAGE_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0,
+)
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Latency of one pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds",
+    "End-to-end latency of an API request",
+    ["endpoint", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+
+CACHE_LOOKUPS = Counter(
+    "rag_cache_lookups_total",
+    "Cache lookups by cache and result",
+    ["cache", "result"],
+)
+
+EARLY_ANSWERS = Counter(
+    "rag_early_answers_total",
+    "Requests answered without calling the LLM",
+    ["reason"],
+)
+
+IN_FLIGHT = Gauge(
+    "rag_in_flight",
+    "Requests / LLM calls currently in progress",
+    ["kind"],
+    multiprocess_mode="livesum",
+)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+@contextmanager
+def timed(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def timed_stage(stage: str):
+    """Decorator form of `timed` for functions that are a stage on their own."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def in_flight(kind: str):
+    gauge = IN_FLIGHT.labels(kind)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+def observe_request(endpoint: str, outcome: str, start: float) -> None:
+    REQUEST_SECONDS.labels(endpoint, outcome).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text exposition; aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,7 +1,10 @@
 import numpy as np
 from typing import List, Dict
 
-from src.embedding.embedding_model import load_embedding_model
+from src.embedding.embedding_model import get_embedding_model, encode_query
+from src.index.index_utils import get_chunk_vectors
+from src.retrieval.scoring import rank_order, top_k_unique
+from src.serving.judge import get_judge_service
 
 
 QUERY_TYPE_WEIGHTS = {
@@ -16,18 +19,26 @@ QUERY_TYPE_WEIGHTS = {
 }
 
 
-_embedding_model = None
+def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.dot(a, b))
 
 
-def _get_embedding_model():
-    global _embedding_model
-    if _embedding_model is None:
-        _embedding_model = load_embedding_model()
-    return _embedding_model
+def chunk_embeddings(chunks: List[Dict]) -> np.ndarray:
+    # Prefer vectors already carried on the chunk, then the indexed vectors
+    # by vector_id; only fall back to running the encoder over the texts.
+    carried = [c.get("embedding") for c in chunks]
+    if all(e is not None for e in carried):
+        return np.vstack(carried).astype("float32", copy=False)
 
+    if all(c.get("vector_id") is not None for c in chunks):
+        return get_chunk_vectors([c["vector_id"] for c in chunks])
 
-def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    return float(np.dot(a, b))
+    chunk_embs = get_embedding_model().encode(
+        [c["text"] for c in chunks],
+        normalize_embeddings=True,
+        show_progress_bar=False,
+    )
+    return np.asarray(chunk_embs, dtype="float32")
 
 
 def rerank(
@@ -36,57 +47,102 @@ def rerank(
     query_type: str,                    
     top_k: int = 5,
     min_score: float = 0.15,
+    lexical_admit_rank: int = 3,
 ) -> List[Dict]:
+    """
+    Score chunks by query cosine times the intent weight; chunks under
+    `min_score` are dropped. When retrieval fused BM25 hits in, the RRF
+    "fusion_score" only breaks ties, and the top `lexical_admit_rank` BM25
+    hits ("lexical_rank") are kept even below the floor, so an exact
+    lexical match with a weak cosine still reaches the prompt. Scores stay
+    on the cosine scale either way.
+    """
 
     if not retrieved_chunks:
         return []
 
-    model = _get_embedding_model()
-
-    rewritten_query = retrieved_chunks[0].get("rewritten_query", query)
-
-    query_emb = model.encode(
-        rewritten_query,
-        normalize_embeddings=True,
-        show_progress_bar=False,
-    )
+    query_emb = retrieved_chunks[0].get("query_embedding")
+    if query_emb is None:
+        rewritten_query = retrieved_chunks[0].get("rewritten_query", query)
+        query_emb = encode_query(rewritten_query)
     query_emb = np.asarray(query_emb, dtype="float32")
 
-    texts = [c["text"] for c in retrieved_chunks]
-
-    chunk_embs = model.encode(
-        texts,
-        normalize_embeddings=True,
-        show_progress_bar=False,
-    )
-    chunk_embs = np.asarray(chunk_embs, dtype="float32")
+    chunk_embs = chunk_embeddings(retrieved_chunks)
 
     intent_weight = QUERY_TYPE_WEIGHTS.get(query_type, 1.0)
 
-    reranked = []
+    sims = chunk_embs @ query_emb
+    final_scores = sims * intent_weight
 
-    for chunk, emb in zip(retrieved_chunks, chunk_embs):
-        sim = cosine_similarity(query_emb, emb)
+    lexical_hit = np.array(
+        [(c.get("lexical_rank") or lexical_admit_rank + 1) <= lexical_admit_rank for c in retrieved_chunks],
+        dtype=bool,
+    )
+    candidates = np.flatnonzero((final_scores >= min_score) | lexical_hit)
+    if not len(candidates):
+        return []
 
-        final_score = sim * intent_weight
+    # ranking ties are broken by input order, so present candidates best-fused first
+    fusion = np.array([c.get("fusion_score", 0.0) for c in retrieved_chunks], dtype="float32")
+    candidates = candidates[np.argsort(-fusion[candidates], kind="stable")]
 
-        if final_score < min_score:
-            continue
+    doc_ids = np.array([str(retrieved_chunks[i].get("doc_id")) for i in candidates], dtype=object)
+    top = candidates[top_k_unique(final_scores[candidates], doc_ids, top_k)]
 
-        reranked.append({
-            **chunk,
-            "rerank_score": float(final_score),
-            "base_similarity": float(sim),
+    # dicts are built for the surviving top_k only
+    return [
+        {
+            **retrieved_chunks[i],
+            "rerank_score": float(final_scores[i]),
+            "base_similarity": float(sims[i]),
             "query_type": query_type,
             "importance": float(intent_weight),
-        })
-
-    reranked.sort(key=lambda x: x["rerank_score"], reverse=True)
+            "embedding": chunk_embs[i],
+        }
+        for i in top
+    ]
 
-    deduped = {}
-    for chunk in reranked:
-        doc_id = chunk.get("doc_id")
-        if doc_id not in deduped:
-            deduped[doc_id] = chunk
 
-    return list(deduped.values())[:top_k]
+def cross_encoder_rerank(
+    query: str,
+    chunks: List[Dict],
+    candidate_budget: int = 6,
+    batch_size: int = 4,
+    max_passage_chars: int = 1200,
+    decisive_margin: float = 4.0,
+    min_ce_score: float | None = None,
+) -> List[Dict]:
+    """
+    Re-order the bi-encoder shortlist with the ms-marco cross-encoder the
+    judge already holds. Only the first `candidate_budget` chunks are kept,
+    scored one batch at a time in bi-encoder order; once the best score leads the
+    runner-up by `decisive_margin` the rest aren't scored and follow the
+    scored chunks in their original order.
+    """
+    if not chunks:
+        return chunks
+
+    judge = get_judge_service()
+    candidates = chunks[:candidate_budget]
+    scores = np.empty(len(candidates), dtype="float32")
+
+    n_scored = 0
+    while n_scored < len(candidates):
+        batch = candidates[n_scored:n_scored + batch_size]
+        pairs = [(query, (c.get("text") or "")[:max_passage_chars]) for c in batch]
+        scores[n_scored:n_scored + len(batch)] = judge.predict(pairs)
+        n_scored += len(batch)
+
+        if n_scored >= 2:
+            runner_up, best = np.partition(scores[:n_scored], n_scored - 2)[-2:]
+            if best - runner_up >= decisive_margin:
+                break
+
+    ranked = [
+        {**candidates[i], "ce_score": float(scores[i])}
+        for i in rank_order(scores[:n_scored])
+    ]
+    if min_ce_score is not None:
+        ranked = ranked[:1] + [c for c in ranked[1:] if c["ce_score"] >= min_ce_score]
+
+    return ranked + candidates[n_scored:]
@@ -1,38 +1,81 @@
-from typing import List, Dict
+from typing import List, Dict, Hashable, Tuple
 
+import numpy as np
 
-def _min_max_normalize(values: List[float]) -> List[float]:
-    min_v = min(values)
-    max_v = max(values)
+
+def _min_max_normalize(values: np.ndarray) -> np.ndarray:
+    min_v = values.min()
+    max_v = values.max()
 
     if max_v == min_v:
-        return [1.0] * len(values)
+        return np.ones_like(values)
+
+    return (values - min_v) / (max_v - min_v)
+
+
+def rank_order(scores: np.ndarray, k: int | None = None) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first; ties keep input order.
+    argpartition narrows to k before the sort, so only the shortlist is ordered.
+    """
+    n = len(scores)
+    if k is None or k >= n:
+        idx = np.arange(n)
+    else:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.lexsort((idx, -scores[idx]))]
 
-    return [(v - min_v) / (max_v - min_v) for v in values]
+
+def top_k_unique(scores: np.ndarray, groups: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k best scores keeping only the best entry per group
+    (e.g. one chunk per doc_id), best first.
+    """
+    n = len(scores)
+    shortlist = min(n, 2 * k)
+    while True:
+        idx = rank_order(scores, shortlist)
+        # first occurrence of each group in score order
+        _, first = np.unique(groups[idx], return_index=True)
+        keep = idx[np.sort(first)][:k]
+        if len(keep) == k or shortlist == n:
+            return keep
+        shortlist = min(n, shortlist * 2)
 
 
 def fuse_scores(
     chunks: List[Dict],
-    alpha: float = 0.6
+    alpha: float = 0.6,
+    top_k: int | None = None,
 ) -> List[Dict]:
 
     if not chunks:
         return []
-    
-    vector_scores = [float(c.get("score", 0.0)) for c in chunks]
-    rerank_scores = [float(c.get("rerank_score", 0.0)) for c in chunks]
 
-    v_norm = _min_max_normalize(vector_scores)
-    r_norm = _min_max_normalize(rerank_scores)
+    vector_scores = np.fromiter((c.get("score", 0.0) for c in chunks), dtype=np.float64, count=len(chunks))
+    rerank_scores = np.fromiter((c.get("rerank_score", 0.0) for c in chunks), dtype=np.float64, count=len(chunks))
+
+    fused = alpha * _min_max_normalize(rerank_scores) + (1 - alpha) * _min_max_normalize(vector_scores)
+    fused = np.array([round(x, 3) for x in fused.tolist()])
+
+    # only the chunks that are returned get copied
+    return [
+        {**chunks[i], "final_score": float(fused[i])}
+        for i in rank_order(fused, top_k)
+    ]
 
-    fused = []
-    for i, chunk in enumerate(chunks):
-        fused_score = alpha * r_norm[i] + (1 - alpha) * v_norm[i]
 
-        fused.append({
-            **chunk,
-            "final_score": round(float(fused_score), 3),
-        })
+def reciprocal_rank_fusion(
+    rankings: List[List[Hashable]],
+    k: int = 60,
+) -> List[Tuple[Hashable, float]]:
+    """
+    Merge ranked id lists by sum of 1 / (k + rank). Only ranks matter, so
+    cosine and BM25 scores never have to be put on the same scale.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
 
-    fused.sort(key=lambda x: x["final_score"], reverse=True)
-    return fused
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
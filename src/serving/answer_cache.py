@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from src.config import get_section
+from src.embedding.embedding_model import encode_query
+from src.index.bm25 import tokenize
+from src.index.index_utils import classify_query_intent, index_version
+from src.index.title_resolver import resolve_title
+from src.llm.abstention import is_abstention
+from src.metrics import CACHE_LOOKUPS
+from src.serving.text_norm import normalize_query
+
+_answer_cache = None
+_cache_lock = threading.Lock()
+
+
+def _stem(token: str) -> str:
+    # just enough to line up "betrayed" / "betray", "kills" / "kill"
+    for suffix in ("ing", "ed", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[: -len(suffix)]
+    return token
+
+
+def role_tokens(query: str) -> list[str]:
+    """Content words of the query, stemmed, in order."""
+    return [_stem(t) for t in tokenize(query)]
+
+
+def same_role_order(a: list[str], b: list[str]) -> bool:
+    """
+    True when the content words both queries share appear in the same order.
+    Embeddings barely separate "Did Batman kill the Joker" from "Did the
+    Joker kill Batman"; the order of batman / kill / joker does.
+    """
+    shared = set(a) & set(b)
+    return [t for t in a if t in shared] == [t for t in b if t in shared]
+
+
+class AnswerCache:
+    """
+    Two-tier cache of final /query responses.
+      1. exact:    normalized query string
+      2. semantic: nearest cached query embedding above `similarity_threshold`,
+                   restricted to entries with the same query intent,
+                   the same resolved film ("Iron Man" vs "Iron Man 2") and
+                   shared content words in the same order (who did what to whom)
+    Entries are evicted LRU-first once `max_entries` or `max_bytes` is
+    exceeded, expire after `ttl_s`, and are dropped wholesale when the
+    FAISS index file changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_s: float = 3600,
+        similarity_threshold: float = 0.95,
+        max_bytes: int = 64 * 1024 * 1024,
+        dim: int = 384,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.similarity_threshold = similarity_threshold
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        # Embedding slots for the semantic tier; a slot is live while its entry is cached
+        self._matrix = np.zeros((max_entries, dim), dtype="float32")
+        self._live = np.zeros(max_entries, dtype=bool)
+        self._slot_keys = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+
+        self._bytes = 0
+        self._version = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_version(self) -> None:
+        version = index_version()
+        if version != self._version:
+            self._clear()
+            self._version = version
+
+    def _clear(self) -> None:
+        self._entries.clear()
+        self._live[:] = False
+        self._slot_keys = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._live[entry["slot"]] = False
+        self._slot_keys[entry["slot"]] = None
+        self._free_slots.append(entry["slot"])
+        self._bytes -= entry["size"]
+
+    def _expired(self, entry: dict) -> bool:
+        return entry["expires_at"] < time.monotonic()
+
+    def _lookup_exact(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry):
+            self._drop(key)
+            return None
+        return entry
+
+    def _lookup_semantic(self, embedding: np.ndarray, intent: str, film: str | None, tokens: list[str]):
+        if not self._live.any():
+            return None
+
+        sims = self._matrix @ embedding
+        sims[~self._live] = -1.0
+
+        for slot in np.argsort(-sims)[:4]:
+            if sims[slot] < self.similarity_threshold:
+                break
+            key = self._slot_keys[slot]
+            entry = self._entries[key]
+            if self._expired(entry):
+                self._drop(key)
+                continue
+            if (
+                entry["intent"] == intent
+                and entry["film"] == film
+                and same_role_order(entry["tokens"], tokens)
+            ):
+                return entry
+
+        return None
+
+    def lookup(self, query: str):
+        """
+        Returns (response or None, probe). Pass the probe back to `put`
+        on a miss so the query isn't normalized or encoded twice.
+        """
+        key = normalize_query(query)
+        probe = {"key": key, "intent": classify_query_intent(query), "embedding": None}
+
+        with self._lock:
+            self._check_version()
+            entry = self._lookup_exact(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                CACHE_LOOKUPS.labels("answer", "exact_hit").inc()
+                return entry["response"], probe
+
+        probe["embedding"] = encode_query(key)
+        match = resolve_title(query)
+        probe["film"] = match["film_id"] if match else None
+        probe["tokens"] = role_tokens(query)
+
+        with self._lock:
+            entry = self._lookup_semantic(
+                probe["embedding"], probe["intent"], probe["film"], probe["tokens"]
+            )
+            if entry is not None:
+                self._entries.move_to_end(entry["key"])
+                self.semantic_hits += 1
+                CACHE_LOOKUPS.labels("answer", "semantic_hit").inc()
+                return entry["response"], probe
+
+            self.misses += 1
+            CACHE_LOOKUPS.labels("answer", "miss").inc()
+            return None, probe
+
+    def put(self, probe: dict, response: dict) -> None:
+        # an "I don't know" may be a transient retrieval miss; caching it would
+        # also hand it to every paraphrase through the semantic tier
+        if probe.get("embedding") is None or is_abstention(response.get("answer", "")):
+            return
+
+        size = len(json.dumps(response)) + probe["embedding"].nbytes
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            key = probe["key"]
+            if key in self._entries:
+                self._drop(key)
+
+            while self._entries and (
+                len(self._entries) >= self.max_entries
+                or self._bytes + size > self.max_bytes
+            ):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+            slot = self._free_slots.pop()
+            self._matrix[slot] = probe["embedding"]
+            self._live[slot] = True
+            self._slot_keys[slot] = key
+
+            self._entries[key] = {
+                "key": key,
+                "intent": probe["intent"],
+                "film": probe.get("film"),
+                "tokens": probe.get("tokens", []),
+                "response": response,
+                "slot": slot,
+                "size": size,
+                "expires_at": time.monotonic() + self.ttl_s,
+            }
+            self._bytes += size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+                "index_version": self._version,
+            }
+
+
+def get_answer_cache() -> AnswerCache | None:
+    global _answer_cache
+    cfg = get_section("answer_cache")
+    if not cfg.get("enabled", True):
+        return None
+
+    if _answer_cache is None:
+        with _cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache(
+                    max_entries=cfg.get("max_entries", 2048),
+                    ttl_s=cfg.get("ttl_s", 3600),
+                    similarity_threshold=cfg.get("similarity_threshold", 0.95),
+                    max_bytes=int(cfg.get("max_mb", 64) * 1024 * 1024),
+                )
+    return _answer_cache
@@ -0,0 +1,29 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from src.config import get_section
+
+_executor = None
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """
+    Shared pool for CPU-bound stages (encode, FAISS, cross-encoder).
+    Sized to the host's cores unless serving.cpu_workers overrides it;
+    torch and FAISS release the GIL so threads scale across cores.
+    """
+    global _executor
+    if _executor is None:
+        workers = get_section("serving").get("cpu_workers") or os.cpu_count() or 4
+        _executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="rag-cpu",
+        )
+    return _executor
+
+
+async def run_cpu(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), partial(fn, *args, **kwargs))
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src.config import get_section
+from src.serving.batcher import MicroBatcher
+
+_judge_service = None
+_judge_lock = threading.Lock()
+
+
+class JudgeService:
+    """
+    Shared cross-encoder judge. Exposes the same `predict(pairs)` call as
+    CrossEncoder, so hallucination_score / precision_at_k / exact_match use it
+    unchanged, but (a, b) pairs from concurrent requests are scored together.
+    """
+
+    def __init__(
+        self,
+        model,
+        max_batch_size: int = 32,
+        window_ms: float = 5.0,
+        latency_window: int = 1024,
+    ):
+        self.model = model
+        self._batcher = MicroBatcher(
+            self._score_batch,
+            max_batch_size=max_batch_size,
+            window_ms=window_ms,
+            name="judge",
+        )
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._pairs = 0
+        self._max_batch_seen = 0
+        self._batch_latencies = deque(maxlen=latency_window)
+
+    def _score_batch(self, pairs: list[tuple]) -> np.ndarray:
+        start = time.perf_counter()
+        scores = self.model.predict(
+            pairs,
+            batch_size=len(pairs),
+            show_progress_bar=False,
+        )
+        elapsed = time.perf_counter() - start
+
+        with self._stats_lock:
+            self._batches += 1
+            self._pairs += len(pairs)
+            self._max_batch_seen = max(self._max_batch_seen, len(pairs))
+            self._batch_latencies.append(elapsed)
+
+        return np.asarray(scores, dtype="float32")
+
+    def predict(self, pairs, **kwargs) -> np.ndarray:
+        futures = [self._batcher.submit((a, b)) for a, b in pairs]
+        return np.array([f.result() for f in futures], dtype="float32")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            latencies = np.array(self._batch_latencies, dtype="float64") * 1000
+            batches = self._batches
+            pairs = self._pairs
+            max_batch = self._max_batch_seen
+
+        return {
+            "batches": batches,
+            "pairs": pairs,
+            "mean_batch_size": round(pairs / batches, 2) if batches else 0.0,
+            "max_batch_size": max_batch,
+            "batch_latency_p50_ms": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else 0.0,
+            "batch_latency_p95_ms": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else 0.0,
+        }
+
+
+def get_judge_service() -> JudgeService:
+    global _judge_service
+    if _judge_service is None:
+        with _judge_lock:
+            if _judge_service is None:
+                # imported here so the serving package doesn't pull in the eval scripts
+                from src.test.exact_match import load_judge_model
+
+                cfg = get_section("judge")
+                _judge_service = JudgeService(
+                    load_judge_model(max_length=cfg.get("max_length", 512)),
+                    max_batch_size=cfg.get("max_batch_size", 32),
+                    window_ms=cfg.get("batch_window_ms", 5.0),
+                )
+    return _judge_service
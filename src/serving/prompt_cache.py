@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from src.config import get_section, resolve_path
+from src.serving.text_norm import normalize_query
+from src.metrics import CACHE_LOOKUPS
+
+_prompt_cache = None
+_cache_lock = threading.Lock()
+
+
+def prompt_cache_key(
+    instruction: str,
+    chunk_ids: list,
+    query: str,
+    model: str,
+    version: str | None = None,
+) -> str:
+    """
+    Hash of what decides the completion: the intent instruction, the packed
+    chunks in prompt order, the normalized query, the model and the index
+    version. Only case, punctuation and whitespace are folded, so "Did
+    Batman kill the Joker" and "Did the Joker kill Batman" never share a
+    key. A rebuilt index changes `version` and with it every key.
+
+    This is the same fold as the answer cache's exact tier, so paraphrases
+    don't share entries here. What this cache adds is persistence: the
+    answer cache is per-process and in memory, while completions stored
+    here are reused by sibling workers, after restarts and after an answer
+    cache entry expired.
+    """
+    payload = json.dumps(
+        [instruction, [str(c) for c in chunk_ids], normalize_query(query), model, version],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    LLM completions keyed by `prompt_cache_key`, persisted in SQLite so they
+    survive restarts and are shared by every worker on the host. Entries
+    expire after `ttl_s`; past `max_entries` / `max_bytes` the least
+    recently used rows are deleted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 20000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_s: float = 86400,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                answer TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS completions_last_used_idx ON completions (last_used)"
+        )
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT answer FROM completions WHERE key = ? AND created_at > ?",
+                (key, now - self.ttl_s),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                CACHE_LOOKUPS.labels("prompt", "miss").inc()
+                return None
+
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            CACHE_LOOKUPS.labels("prompt", "hit").inc()
+            return row[0]
+
+    def put(self, key: str, answer: str) -> None:
+        size = len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, answer, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, answer, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM completions WHERE created_at <= ?", (now - self.ttl_s,)
+        ).rowcount
+        self.evictions += max(expired, 0)
+
+        entries, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        if entries <= self.max_entries and total <= self.max_bytes:
+            return
+
+        # walk LRU-first until both bounds hold again
+        drop = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM completions ORDER BY last_used"
+        ):
+            if entries <= self.max_entries and total <= self.max_bytes:
+                break
+            drop.append((key,))
+            entries -= 1
+            total -= size
+
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", drop)
+        self.evictions += len(drop)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def get_prompt_cache() -> PromptCache | None:
+    global _prompt_cache
+    cfg = get_section("prompt_cache")
+    if not cfg.get("enabled", True):
+        return None
+
+    if _prompt_cache is None:
+        with _cache_lock:
+            if _prompt_cache is None:
+                _prompt_cache = PromptCache(
+                    str(resolve_path(cfg.get("path", "data/cache/prompt_cache.sqlite"))),
+                    max_entries=cfg.get("max_entries", 20000),
+                    max_bytes=int(cfg.get("max_mb", 64) * 1024 * 1024),
+                    ttl_s=cfg.get("ttl_s", 86400),
+                )
+    return _prompt_cache
@@ -0,0 +1,8 @@
+import re
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, punctuation to spaces, whitespace collapsed; word order kept."""
+    query = query.lower()
+    query = re.sub(r"[^a-z0-9\s]", " ", query)
+    return re.sub(r"\s+", " ", query).strip()
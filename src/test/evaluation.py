@@ -1,6 +1,7 @@
 from .retrieval_metric import precision_at_k, recall_at_k
 from .hallucination_check import hallucination_score
-from .exact_match import exact_match, load_judge_model
+from .exact_match import exact_match
+from ..serving.judge import get_judge_service
 from ..llm.generate import generate_answer
 
 import mlflow
@@ -126,7 +127,7 @@ EVAL_SET = [
 
 
 def run():
-    judge = load_judge_model()
+    judge = get_judge_service()
 
     mlflow.set_experiment("film_rag_evaluation")
     mlflow.set_tracking_uri("http://127.0.0.1:5000")
@@ -2,10 +2,11 @@ from sentence_transformers import CrossEncoder
 import re
 
 
-def load_judge_model():
+def load_judge_model(max_length: int | None = None):
     return CrossEncoder(
         "cross-encoder/ms-marco-MiniLM-L-6-v2",
         device="cpu",
+        max_length=max_length,
         local_files_only=True
     )
 
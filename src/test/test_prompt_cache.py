@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+from ..serving.prompt_cache import PromptCache, prompt_cache_key
+
+
+INSTRUCTION = "You are a STRICT cause–effect extraction system."
+CHUNKS = ["DOC_000012_C003", "DOC_000012_C007"]
+MODEL = "groq:llama-3.3-70b-versatile"
+
+
+def run_tests():
+    print("PROMPT CACHE KEY TESTING")
+
+    # same content words, different question: must not collide
+    a = prompt_cache_key(INSTRUCTION, CHUNKS, "Did Batman kill the Joker?", MODEL, "v1")
+    b = prompt_cache_key(INSTRUCTION, CHUNKS, "Did the Joker kill Batman?", MODEL, "v1")
+    assert a != b, "Reordered question shares a cache key"
+
+    a = prompt_cache_key(INSTRUCTION, CHUNKS, "Who betrayed Cobb?", MODEL, "v1")
+    b = prompt_cache_key(INSTRUCTION, CHUNKS, "Who did Cobb betray?", MODEL, "v1")
+    assert a != b, "Subject/object swap shares a cache key"
+
+    # case, punctuation and whitespace are folded
+    a = prompt_cache_key(INSTRUCTION, CHUNKS, "Who directed Inception?", MODEL, "v1")
+    b = prompt_cache_key(INSTRUCTION, CHUNKS, "  who directed   INCEPTION ", MODEL, "v1")
+    assert a == b, "Formatting-only difference changed the key"
+
+    # chunk order is part of the prompt
+    b = prompt_cache_key(INSTRUCTION, CHUNKS[::-1], "Who directed Inception?", MODEL, "v1")
+    assert a != b, "Chunk order ignored"
+
+    # an index rebuild invalidates every entry
+    b = prompt_cache_key(INSTRUCTION, CHUNKS, "Who directed Inception?", MODEL, "v2")
+    assert a != b, "Index version ignored"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = PromptCache(os.path.join(tmp, "prompt_cache.sqlite"))
+        cache.put(prompt_cache_key(INSTRUCTION, CHUNKS, "Did Batman kill the Joker?", MODEL), "Yes.")
+        assert cache.get(prompt_cache_key(INSTRUCTION, CHUNKS, "Did the Joker kill Batman?", MODEL)) is None
+        assert cache.get(prompt_cache_key(INSTRUCTION, CHUNKS, "did batman kill the joker", MODEL)) == "Yes."
+
+    print("\n Prompt cache testing completed successfully")
+
+
+if __name__ == "__main__":
+    run_tests()